@@ -1,24 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
+import time
 from dotenv import load_dotenv
+from cache import TTLCache
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+# When set, user data routes (/users/{user_id}/... and the /routines, /tasks,
+# /goals, /todos and /bucketlists ones addressed by row id) need a token and
+# only serve the user named in it
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "false").lower() in ("1", "true", "yes")
+
+# Decoded claims per token, and user principals per username (for tokens
+# minted before the "uid" claim existed)
+claims_cache = TTLCache(maxsize=10000, ttl=300)
+principal_cache = TTLCache(maxsize=10000, ttl=300)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is deliberately slow (~250ms); async routes hand it to this bounded
+# pool so a login spike can't stall the event loop. bcrypt releases the GIL.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_pool, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_pool, get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -28,3 +54,23 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+def decode_access_token(token: str):
+    # Returns the token's claims, or None if it is invalid or expired.
+    # Verified claims are cached until the token expires (capped by the TTL).
+    claims = claims_cache.get(token)
+    if claims is not None:
+        if claims["exp"] > time.time():
+            return claims
+        claims_cache.delete(token)
+        return None
+
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if "sub" not in claims or "exp" not in claims:
+        return None
+
+    claims_cache.set(token, claims, ttl=min(claims_cache.ttl, claims["exp"] - time.time()))
+    return claims
@@ -0,0 +1,193 @@
+"""API benchmark suite.
+
+Seeds a database through seed_data.py (users, routines, tasks, years of
+task logs with streaks, todos, goals and bucket lists), then drives the key
+endpoints in-process through the ASGI app and reports p50/p99 latency,
+throughput and SQL statements per request as JSON. Data and requests both
+count back from --end-date rather than today, so runs with the same --seed
+are reproducible and reports can be compared across releases.
+
+    python benchmarks/bench_api.py --users 100 --years 2 --requests 500
+    python benchmarks/bench_api.py --database-url postgresql://localhost/bench --reset
+
+Runs against a throwaway SQLite database unless --database-url is given.
+Set ASYNC_DB=1 to benchmark the async engine. The response cache is off
+unless --response-cache is passed, so reads measure the database path.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PASSWORD = "bench-password"
+
+def setup_app(database_url: str = None, response_cache: bool = False):
+    # Fresh working dir (static files, default SQLite database); main.py is
+    # imported afterwards so it picks up the environment.
+    workdir = tempfile.mkdtemp(prefix="bench_api_")
+    os.makedirs(os.path.join(workdir, "static", "images"))
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{workdir}/bench.db"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "true" if response_cache else "false"
+    sys.path.insert(0, BACKEND_DIR)
+
+    import main
+    return main.app
+
+def reset_database(database, models, reset: bool):
+    with database.SessionLocal() as db:
+        has_users = db.query(models.User.id).first() is not None
+    if has_users and not reset:
+        raise SystemExit("The database already has users; pass --reset to drop and recreate its tables")
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+
+def percentile(samples, fraction: float):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+async def drive(client, name: str, make_request, requests: int, concurrency: int):
+    import metrics
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statements = [], []
+    errors = 0
+
+    async def one(index: int):
+        nonlocal errors
+        async with semaphore:
+            # Each request runs in its own task, so its statements are
+            # attributed to it alone
+            queries = metrics.RequestQueries()
+            metrics.current_queries.set(queries)
+            start = time.perf_counter()
+            response = await make_request(client, index)
+            latencies.append(time.perf_counter() - start)
+            statements.append(len(queries.statements))
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(asyncio.create_task(one(index)) for index in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return name, {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "statements_mean": round(statistics.fmean(statements), 2),
+        "statements_max": max(statements),
+    }
+
+def scenarios(counts, years: int, end_date, rng):
+    users, routines, tasks = counts["users"], counts["routines"], counts["routine_tasks"]
+    # Request parameters are drawn up front so every run sends the same ones
+    picks = [rng.random() for _ in range(100000)]
+
+    def pick(index: int, upper: int):
+        return int(picks[index % len(picks)] * upper) + 1
+
+    async def complete_task(client, index):
+        day = end_date - timedelta(days=pick(index, years * 365) - 1)
+        return await client.post(f"/tasks/{pick(index, tasks)}/complete", params={"date_str": day.isoformat()})
+
+    async def read_routines(client, index):
+        return await client.get(f"/users/{pick(index, users)}/routines/")
+
+    async def routine_history(client, index):
+        year = end_date.year - pick(index, years) + 1
+        return await client.get(f"/routines/{pick(index, routines)}/history", params={"from": f"{year}-01-01", "to": f"{year}-12-31"})
+
+    async def todo_stats(client, index):
+        year = end_date.year - pick(index, years) + 1
+        return await client.get(f"/users/{pick(index, users)}/todos/stats", params={"filter_type": "month", "month": pick(index, 12), "year": year})
+
+    async def token(client, index):
+        return await client.post("/token", data={"username": f"user{pick(index, users)}", "password": PASSWORD})
+
+    return {
+        "complete_task": complete_task,
+        "read_routines": read_routines,
+        "routine_history": routine_history,
+        "todo_stats": todo_stats,
+        "token": token,
+    }
+
+async def run_benchmarks(app, counts, end_date, args):
+    import httpx
+
+    rng = random.Random(args.seed)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, make_request in scenarios(counts, args.years, end_date, rng).items():
+            # bcrypt makes logins ~1000x slower than the rest; fewer of them
+            requests = args.token_requests if name == "token" else args.requests
+            name, result = await drive(client, name, make_request, requests, args.concurrency)
+            results[name] = result
+    return results
+
+def main(args):
+    app = setup_app(args.database_url, args.response_cache)
+    import database, models, metrics, seed_data
+
+    if not metrics.METRICS_ENABLED:
+        metrics.instrument(database.async_engine.sync_engine if database.async_engine else database.engine)
+
+    reset_database(database, models, reset=args.reset or not args.database_url)
+    end_date = args.end_date or seed_data.DEFAULT_END_DATE
+    start = time.perf_counter()
+    counts = seed_data.seed(
+        users=args.users, routines=args.routines, tasks=args.tasks, years=args.years,
+        todos=args.todos, seed=args.seed, password=PASSWORD,
+        end_date=end_date
+    )
+    seed_seconds = time.perf_counter() - start
+
+    return {
+        "config": {
+            "database": database.engine.dialect.name,
+            "async_db": database.ASYNC_DB,
+            "response_cache": args.response_cache,
+            "seed": args.seed,
+            "end_date": end_date.isoformat(),
+        },
+        "rows": counts,
+        "seed_seconds": round(seed_seconds, 2),
+        "endpoints": asyncio.run(run_benchmarks(app, counts, end_date, args)),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="benchmark this database instead of a temporary SQLite file")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate the tables of --database-url")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--routines", type=int, default=4, help="routines per user")
+    parser.add_argument("--tasks", type=int, default=3, help="tasks per routine")
+    parser.add_argument("--years", type=int, default=1, help="years of task logs and todos")
+    parser.add_argument("--todos", type=int, default=200, help="todos per user")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--token-requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--response-cache", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--end-date", type=date.fromisoformat,
+        help="last day of seeded history (default: seed_data.DEFAULT_END_DATE)"
+    )
+    args = parser.parse_args()
+
+    print(json.dumps(main(args), indent=2))
@@ -0,0 +1,101 @@
+"""Login throughput benchmark.
+
+Fires concurrent POST /token requests at the app in-process and, at the same
+time, pings GET / to show whether other requests on the worker are stalled
+while bcrypt runs. Prints a JSON report.
+
+    python benchmarks/bench_login.py --logins 50 --concurrency 10
+
+Runs against a throwaway SQLite database unless --database-url is given.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def setup_app(database_url: str = None):
+    # Fresh working dir (static files, default SQLite database); main.py is
+    # imported afterwards so it picks these up. DATABASE_URL from the shell
+    # is ignored so a benchmark never writes to a real database by accident.
+    workdir = tempfile.mkdtemp(prefix="bench_login_")
+    os.makedirs(os.path.join(workdir, "static", "images"))
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{workdir}/bench.db"
+    sys.path.insert(0, BACKEND_DIR)
+
+    import main
+    return main.app
+
+def reset_database(reset: bool):
+    import database, models
+    with database.SessionLocal() as db:
+        has_users = db.query(models.User.id).first() is not None
+    if has_users and not reset:
+        raise SystemExit("The database already has users; pass --reset to drop and recreate its tables")
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+
+async def run(app, logins: int, concurrency: int):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/users/", json={
+            "username": "bench", "email": "bench@example.com",
+            "full_name": "Bench", "password": "bench-password"
+        })
+
+        semaphore = asyncio.Semaphore(concurrency)
+        login_latencies = []
+        ping_latencies = []
+        done = asyncio.Event()
+
+        async def login():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/token", data={"username": "bench", "password": "bench-password"})
+                login_latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        async def ping():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/")
+                ping_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        pinger = asyncio.create_task(ping())
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await pinger
+
+    return {
+        "logins": logins,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "logins_per_second": round(logins / elapsed, 2),
+        "login_p50_ms": round(statistics.median(login_latencies) * 1000, 2),
+        "login_max_ms": round(max(login_latencies) * 1000, 2),
+        "ping_p50_ms": round(statistics.median(ping_latencies) * 1000, 2),
+        "ping_max_ms": round(max(ping_latencies) * 1000, 2),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="benchmark this database instead of a temporary SQLite file")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate the tables of --database-url")
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    app = setup_app(args.database_url)
+    reset_database(reset=args.reset or not args.database_url)
+    print(json.dumps(asyncio.run(run(app, args.logins, args.concurrency)), indent=2))
@@ -0,0 +1,116 @@
+"""Todo stats latency benchmark.
+
+Grows the todos table in steps and times crud.get_todo_stats for one user's
+month/year/range/date filters at each size. Month, year and range read the
+daily_user_stats rollup, rebuilt after each step as the write paths would
+keep it; date counts todos over the (user_id, due_date) index. Either way
+the latency should stay flat as the table grows. Prints a JSON report.
+
+    python benchmarks/bench_todo_stats.py --steps 10000 100000 1000000
+
+Runs against a throwaway SQLite database unless --database-url is given.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def setup_db(database_url: str = None, reset: bool = False):
+    # DATABASE_URL from the shell is ignored so a benchmark never writes to a
+    # real database by accident
+    workdir = tempfile.mkdtemp(prefix="bench_todo_stats_")
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{workdir}/bench.db"
+    sys.path.insert(0, BACKEND_DIR)
+
+    import database, models
+    models.Base.metadata.create_all(bind=database.engine)
+    with database.SessionLocal() as db:
+        has_rows = db.query(models.User.id).first() is not None or db.query(models.Todo.id).first() is not None
+    if has_rows and not reset:
+        raise SystemExit("The database already has data; pass --reset to drop and recreate its tables")
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+    return database
+
+def seed(db, models, count: int, users: int, rng: random.Random):
+    import rollups
+
+    # Todos spread over `users` users and three years of due dates
+    start = datetime(2024, 1, 1)
+    statuses = ["pending", "completed", "skipped"]
+    rows = [
+        {
+            "user_id": rng.randint(1, users),
+            "name": "todo",
+            "due_date": start + timedelta(minutes=rng.randrange(3 * 365 * 24 * 60)),
+            "status": rng.choice(statuses),
+            "created_at": start,
+        }
+        for _ in range(count)
+    ]
+    db.execute(models.Todo.__table__.insert(), rows)
+    rollups.rebuild(db)
+    db.commit()
+
+def seed_users(db, models, users: int):
+    # Owners for the todos (foreign keys are enforced)
+    db.execute(models.User.__table__.insert(), [
+        {"id": user_id, "username": f"user{user_id}", "email": f"user{user_id}@example.com"}
+        for user_id in range(1, users + 1)
+    ])
+    db.commit()
+
+def time_call(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 3)
+
+def run(steps, users: int, repeat: int, seed_value: int, database_url: str = None, reset: bool = False):
+    database = setup_db(database_url, reset=reset or not database_url)
+    import crud, models
+
+    rng = random.Random(seed_value)
+    filters = {
+        "month": dict(filter_type="month", month=6, year=2025),
+        "year": dict(filter_type="year", year=2025),
+        "range": dict(filter_type="range", date_from=date(2025, 3, 1), date_to=date(2025, 3, 31)),
+        "date": dict(filter_type="date", specific_date=date(2025, 3, 15)),
+    }
+
+    report = []
+    db = database.SessionLocal()
+    try:
+        seed_users(db, models, users)
+        rows = 0
+        for target in steps:
+            seed(db, models, target - rows, users, rng)
+            rows = target
+            result = {"todos": rows}
+            for name, kwargs in filters.items():
+                result[f"{name}_p50_ms"] = time_call(lambda: crud.get_todo_stats(db, user_id=1, **kwargs), repeat)
+            report.append(result)
+    finally:
+        db.close()
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="benchmark this database instead of a temporary SQLite file")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate the tables of --database-url")
+    parser.add_argument("--steps", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.steps, args.users, args.repeat, args.seed, args.database_url, args.reset), indent=2))
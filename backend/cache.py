@@ -0,0 +1,116 @@
+from collections import OrderedDict
+import os
+import threading
+import time
+import uuid
+import database, models
+
+class TTLCache:
+    # Small in-process LRU whose entries also expire after `ttl` seconds
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+
+# Everything cached per user, by the collection it was read from
+USER_COLLECTIONS = ["user", "routines", "goals", "task_logs", "todos", "bucket_lists"]
+
+# Version of a collection no write has touched since collection_versions
+# was created
+INITIAL_VERSION = "initial"
+
+def versions(db, user_id: int, collections):
+    """Current versions of a user's collections, in the order given.
+
+    They live in the database (collection_versions), so every worker sees
+    the same ones: they name the weak ETags and key the response cache.
+    """
+    rows = dict(db.query(models.CollectionVersion.collection, models.CollectionVersion.version).filter(
+        models.CollectionVersion.user_id == user_id,
+        models.CollectionVersion.collection.in_(collections)
+    ).all())
+    return tuple(rows.get(collection, INITIAL_VERSION) for collection in collections)
+
+def invalidate(db, user_id: int, *collections: str):
+    """Give a user's `collections` new versions, dropping what was built on the old ones.
+
+    crud write functions call this before committing, so the new versions
+    commit (or roll back) together with the data they describe. A random
+    token, not a counter, so one is never reused.
+    """
+    if user_id is None or not collections:
+        return
+    table = models.CollectionVersion.__table__
+    stmt = database.dialect_insert(db)(table)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.collection],
+            set_={"version": stmt.excluded.version}
+        ),
+        [{"user_id": user_id, "collection": collection, "version": uuid.uuid4().hex} for collection in dict.fromkeys(collections)]
+    )
+
+class ResponseCache:
+    """Per-process cache of serialized per-user API responses.
+
+    An entry is keyed by endpoint, user, query params and the versions() of
+    every collection the endpoint reads. A write gives the collections it
+    touched new versions, so entries built on the old ones are never looked
+    up again, by any worker, and age out of the backend.
+
+    The backend is anything with get(key) / set(key, value, ttl=None) /
+    delete(key), TTLCache by default (set_backend to change it).
+    """
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+
+    def key(self, endpoint: str, user_id: int, versions, params: dict = None):
+        return ("response", endpoint, user_id, versions, tuple(sorted((params or {}).items())))
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+response_cache = ResponseCache(
+    TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL),
+    enabled=RESPONSE_CACHE_ENABLED
+)
+
+def set_backend(backend):
+    response_cache.backend = backend
@@ -1,18 +1,34 @@
-from sqlalchemy.orm import Session
-import models, schemas
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import or_, case, select, func, insert, update, delete
+import models, schemas, streaks, rollups, database, pagination, cache
 from passlib.context import CryptContext
 from datetime import datetime
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    # schemas.User nests routines -> tasks and goals; load them up front
+    # so serialization doesn't issue one SELECT per routine.
+    return db.query(models.User).options(
+        selectinload(models.User.routines).selectinload(models.Routine.tasks),
+        selectinload(models.User.goals)
+    ).filter(models.User.id == user_id).first()
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+def get_user_by_username(db: Session, username: str):
+    return db.query(models.User).filter(models.User.username == username).first()
+
+def get_user_by_login(db: Session, login: str):
+    # Login accepts either email or username; one query, email match first
+    return db.query(models.User).filter(
+        or_(models.User.email == login, models.User.username == login)
+    ).order_by(case((models.User.email == login, 0), else_=1)).first()
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str = None):
+    if hashed_password is None:
+        hashed_password = pwd_context.hash(user.password)
     db_user = models.User(
         email=user.email, 
         username=user.username, 
@@ -20,9 +36,11 @@ def create_user(db: Session, user: schemas.UserCreate):
         hashed_password=hashed_password
     )
     db.add(db_user)
+    db.flush()
+    # Fresh versions, so a reused id never matches an old account's ETags
+    cache.invalidate(db, db_user.id, *cache.USER_COLLECTIONS)
     db.commit()
-    db.refresh(db_user)
-    return db_user
+    return get_user(db, db_user.id)
 
 def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
     db_user = get_user(db, user_id)
@@ -34,9 +52,19 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
         setattr(db_user, key, value)
     
     db.add(db_user)
+    cache.invalidate(db, user_id, "user")
+    db.commit()
+    # Re-read with the eager loads instead of refresh() + lazy loads
+    return get_user(db, user_id)
+
+def delete_user(db: Session, user_id: int):
+    # The account and everything it owns, in one DELETE (ON DELETE CASCADE)
+    # Its collection versions go too; create_user gives a new account fresh ones
+    deleted = db.execute(delete(models.User).where(models.User.id == user_id)).rowcount
+    if not deleted:
+        return False
     db.commit()
-    db.refresh(db_user)
-    return db_user
+    return True
 
 def create_routine(db: Session, routine: schemas.RoutineCreate, user_id: int):
     # Create Routine
@@ -57,19 +85,30 @@ def create_routine(db: Session, routine: schemas.RoutineCreate, user_id: int):
         db_task = models.RoutineTask(**task_data, routine_id=db_routine.id)
         db.add(db_task)
     
+    cache.invalidate(db, user_id, "routines")
     db.commit()
-    db.refresh(db_routine)
-    return db_routine
+    return get_routine(db, db_routine.id)
 
 def create_goal(db: Session, goal: schemas.GoalCreate, user_id: int):
     db_goal = models.Goal(**goal.dict(), user_id=user_id)
     db.add(db_goal)
+    cache.invalidate(db, user_id, "goals")
     db.commit()
     db.refresh(db_goal)
     return db_goal
 
-def get_goals(db: Session, user_id: int):
-    return db.query(models.Goal).filter(models.Goal.user_id == user_id).all()
+# Keyset pagination keys for the list endpoints
+GOAL_PAGE_KEY = [models.Goal.id]
+TODO_PAGE_KEY = [models.Todo.created_at, models.Todo.id]
+BUCKET_LIST_PAGE_KEY = [models.BucketList.created_date, models.BucketList.id]
+TASK_LOG_PAGE_KEY = [models.TaskLog.date, models.TaskLog.id]
+
+def get_goals(db: Session, user_id: int, status: str = None, after=None, limit: int = None, fields=None):
+    query = db.query(models.Goal).filter(models.Goal.user_id == user_id)
+    if status:
+        query = query.filter(models.Goal.status == status)
+    query = pagination.project(query, models.Goal, fields, GOAL_PAGE_KEY)
+    return pagination.paginate(query, GOAL_PAGE_KEY, after=after, limit=limit).all()
 
 def update_goal(db: Session, goal_id: int, goal_update: schemas.GoalUpdate):
     db_goal = db.query(models.Goal).filter(models.Goal.id == goal_id).first()
@@ -81,6 +120,7 @@ def update_goal(db: Session, goal_id: int, goal_update: schemas.GoalUpdate):
         setattr(db_goal, key, value)
     
     db.add(db_goal)
+    cache.invalidate(db, db_goal.user_id, "goals")
     db.commit()
     db.refresh(db_goal)
     return db_goal
@@ -90,122 +130,119 @@ def delete_goal(db: Session, goal_id: int):
     if not db_goal:
         return None
     db.delete(db_goal)
+    cache.invalidate(db, db_goal.user_id, "goals")
     db.commit()
     return db_goal
 
+def get_routine(db: Session, routine_id: int):
+    # populate_existing: after a write the session may still hold this routine
+    # with a stale tasks collection (async sessions don't expire on commit)
+    return db.query(models.Routine).options(
+        selectinload(models.Routine.tasks)
+    ).filter(models.Routine.id == routine_id).populate_existing().first()
+
+def get_owner(db: Session, model, id: int):
+    # user_id of a Routine / Goal / Todo / BucketList row, None if it doesn't exist
+    return db.query(model.user_id).filter(model.id == id).scalar()
+
+def get_task_owners(db: Session, task_ids):
+    return {user_id for (user_id,) in db.query(models.Routine.user_id).join(
+        models.RoutineTask, models.RoutineTask.routine_id == models.Routine.id
+    ).filter(models.RoutineTask.id.in_(task_ids)).distinct()}
+
 def get_routines(db: Session, user_id: int):
-    return db.query(models.Routine).filter(models.Routine.user_id == user_id).all()
+    return db.query(models.Routine).options(
+        selectinload(models.Routine.tasks)
+    ).filter(models.Routine.user_id == user_id).all()
 
 def create_task_log(db: Session, task_id: int, date, status: str = "completed"):
-    # Check if already exists
-    existing = db.query(models.TaskLog).filter(models.TaskLog.task_id == task_id, models.TaskLog.date == date).first()
-    if existing:
-        existing.status = status
-        db.commit()
-        db.refresh(existing)
-        # We might need to re-evaluate streak if status changed, but let's assume it's fine for now or handle below
-    else:
-        db_log = models.TaskLog(task_id=task_id, date=date, status=status)
-        db.add(db_log)
-        db.commit()
-        db.refresh(db_log)
-
-    # Streak Logic
-    # 1. Get the routine for this task
-    task = db.query(models.RoutineTask).filter(models.RoutineTask.id == task_id).first()
-    if not task:
-        return db_log if 'db_log' in locals() else existing
-
-    routine = db.query(models.Routine).filter(models.Routine.id == task.routine_id).first()
-    if not routine:
-        return db_log if 'db_log' in locals() else existing
+    db_logs = create_task_logs(db, [(task_id, date, status)])
+    return db_logs[0] if db_logs else None
+
+def create_task_logs(db: Session, entries):
+    # entries: iterable of (task_id, date, status). The last entry wins when
+    # the same task/day appears twice (ON CONFLICT can't touch a row twice).
+    # Returns None, writing nothing, if any task doesn't exist.
+    rows = {}
+    for task_id, date, status in entries:
+        rows[(task_id, date)] = status
+    if not rows:
+        return []
 
-    # 2. Check if all tasks in this routine are completed for this date
-    # Get all task IDs for this routine
-    routine_task_ids = [t.id for t in routine.tasks]
-    total_tasks = len(routine_task_ids)
-    
-    # Get count of completed tasks for this routine on this date
-    completed_count = db.query(models.TaskLog).filter(
-        models.TaskLog.task_id.in_(routine_task_ids),
-        models.TaskLog.date == date,
-        models.TaskLog.status == "completed"
-    ).count()
-
-    if completed_count == total_tasks:
-        # Routine Completed!
-        # Check if we already updated streak for today
-        # We can check last_completed_date. 
-        # Note: 'date' passed here is usually datetime at midnight.
-        
-        # If last_completed_date is None, this is the first time.
-        # If last_completed_date == date, we already counted this day.
-        # If last_completed_date == date - 1 day, increment streak.
-        # If last_completed_date < date - 1 day, streak broken (but we might have reset it on read? No, let's handle here).
-        
-        from datetime import timedelta
-        
-        if routine.last_completed_date == date:
-            pass # Already counted
-        elif routine.last_completed_date == date - timedelta(days=1):
-            routine.current_streak += 1
-            routine.last_completed_date = date
-        else:
-            # Broken streak or new streak
-            # If it was broken, save last streak
-            if routine.current_streak > 0:
-                routine.last_streak = routine.current_streak
-            
-            routine.current_streak = 1
-            routine.last_completed_date = date
-        
-        # Update longest
-        if routine.current_streak > routine.longest_streak:
-            routine.longest_streak = routine.current_streak
-            
-        db.commit()
-        db.refresh(routine)
+    task_ids = {task_id for task_id, _ in rows}
+    routine_of = dict(db.query(models.RoutineTask.id, models.RoutineTask.routine_id).filter(
+        models.RoutineTask.id.in_(task_ids)
+    ).all())
+    if len(routine_of) < len(task_ids):
+        return None
 
-    return db_log if 'db_log' in locals() else existing
+    # Single-statement multi-row upsert on (task_id, date): no read-then-write
+    # race when the same task is ticked twice, and one round trip for the logs.
+    now = datetime.utcnow()
+    insert = database.dialect_insert(db)
+    stmt = insert(models.TaskLog)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.TaskLog.task_id, models.TaskLog.date],
+        set_={"status": stmt.excluded.status}
+    ).returning(models.TaskLog)
+    db_logs = db.scalars(stmt, [
+        {"task_id": task_id, "date": date, "status": status, "completed_at": now}
+        for (task_id, date), status in rows.items()
+    ], execution_options={"populate_existing": True}).all()
+
+    # Streak Logic: adjusts each routine's run summary for the affected dates
+    # only, once per routine and day, so backfilled dates don't rescan history.
+    # One commit for the whole batch.
+    owners, streak_owners = set(), set()
+    for task_id, date in _one_task_per_routine_day(rows, routine_of):
+        routine = streaks.update_for_day(db, task_id=task_id, date=date)
+        if routine is not None:
+            streak_owners.add(routine.user_id)
+        owners.add(rollups.refresh_tasks_completed(db, task_id=task_id, date=date))
+
+    # Detach so the commit doesn't expire the rows RETURNING just gave us
+    for db_log in db_logs:
+        db.expunge(db_log)
+    _invalidate_task_logs(db, owners, streak_owners)
+    db.commit()
+    return db_logs
+
+def _invalidate_task_logs(db: Session, owners, streak_owners):
+    # Routines only change when a streak did
+    for user_id in owners:
+        cache.invalidate(db, user_id, "task_logs")
+    for user_id in streak_owners:
+        cache.invalidate(db, user_id, "routines")
+
+def _one_task_per_routine_day(keys, routine_of):
+    picked = {}
+    for task_id, date in keys:
+        picked.setdefault((routine_of[task_id], date), task_id)
+    # In routine order, so concurrent batches lock routines in the same order
+    return [(picked[key], key[1]) for key in sorted(picked)]
+
+def complete_routine(db: Session, routine_id: int, date, status: str = "completed"):
+    routine = get_routine(db, routine_id)
+    if not routine:
+        return None
+    return create_task_logs(db, [(task.id, date, status) for task in routine.tasks])
 
 def delete_task_log(db: Session, task_id: int, date):
-    db_log = db.query(models.TaskLog).filter(models.TaskLog.task_id == task_id, models.TaskLog.date == date).first()
-    if db_log:
-        # Get routine info to update streak if necessary
-        task = db.query(models.RoutineTask).filter(models.RoutineTask.id == task_id).first()
-        routine = None
-        if task:
-            routine = db.query(models.Routine).filter(models.Routine.id == task.routine_id).first()
-
-        db.delete(db_log)
-        db.commit()
-        
-        # Check if we need to revert streak
-        # If the routine was marked as completed on this date, removing a task means it's no longer completed.
-        if routine and routine.last_completed_date == date:
-            # If we are about to reduce the current streak, check if we need to reduce longest_streak too.
-            # This happens if the current streak WAS the longest streak (or equal to it).
-            # Specifically, if current_streak == longest_streak, and we reduce current, 
-            # then longest should probably also be reduced IF this streak was the one setting the record.
-            # However, we can't easily know if there was *another* previous streak of the same length.
-            # But for the specific case the user mentioned (new routine, streak 0->1->0), 
-            # if current == longest, we should decrement both.
-            
-            if routine.current_streak > 0:
-                if routine.current_streak == routine.longest_streak:
-                    routine.longest_streak -= 1
-                routine.current_streak -= 1
-            
-            # Revert last_completed_date to the previous day
-            # Assuming a valid streak meant the previous day was completed.
-            from datetime import timedelta
-            routine.last_completed_date = date - timedelta(days=1)
-            
-            db.add(routine)
-            db.commit()
-            
-        return True
-    return False
+    deleted = db.query(models.TaskLog).filter(
+        models.TaskLog.task_id == task_id,
+        models.TaskLog.date == date
+    ).delete(synchronize_session=False)
+    if not deleted:
+        return False
+
+    # If the routine was fully completed on this date it no longer is;
+    # the run summary restores current/longest streak and last_completed_date.
+    routine = streaks.update_for_day(db, task_id=task_id, date=date)
+    owner = rollups.refresh_tasks_completed(db, task_id=task_id, date=date)
+
+    _invalidate_task_logs(db, {owner}, {routine.user_id} if routine is not None else set())
+    db.commit()
+    return True
 
 def get_today_task_logs(db: Session, user_id: int, date):
     # Join routines to filter by user_id
@@ -214,124 +251,177 @@ def get_today_task_logs(db: Session, user_id: int, date):
         models.TaskLog.date == date
     ).all()
 
+def get_dashboard(db: Session, user_id: int, date):
+    # Everything the dashboard page needs, in a fixed number of queries
+    # (routine tasks come from a single selectin load, not one per routine).
+    return {
+        "goals": get_goals(db, user_id=user_id),
+        "routines": get_routines(db, user_id=user_id),
+        "today_logs": get_today_task_logs(db, user_id=user_id, date=date),
+        "todos": get_todos(db, user_id=user_id),
+    }
+
 def update_routine(db: Session, routine_id: int, routine_update: schemas.RoutineCreate):
-    db_routine = db.query(models.Routine).filter(models.Routine.id == routine_id).first()
-    if not db_routine:
+    # Set-based diff of the tasks, applied as one bulk UPDATE, INSERT and
+    # DELETE each. Removed tasks take their logs with them through
+    # ON DELETE CASCADE, so no TaskLog is loaded however long the history.
+    user_id = db.execute(
+        update(models.Routine).where(models.Routine.id == routine_id).values(
+            name=routine_update.name,
+            routine_type=routine_update.routine_type,
+            description=routine_update.description
+        ).returning(models.Routine.user_id)
+    ).scalar()
+    if user_id is None:
         return None
-    
-    # Update basic fields
-    db_routine.name = routine_update.name
-    db_routine.routine_type = routine_update.routine_type
-    db_routine.description = routine_update.description
-    
-    # Update tasks intelligently
-    # 1. Get existing tasks map
-    existing_tasks_map = {task.id: task for task in db_routine.tasks}
-    
-    # 2. Process incoming tasks
-    incoming_task_ids = []
-    
+
+    existing = {
+        task.id: task for task in db.execute(
+            select(models.RoutineTask.id, models.RoutineTask.name, models.RoutineTask.time, models.RoutineTask.description)
+            .where(models.RoutineTask.routine_id == routine_id)
+        )
+    }
+
+    changed, added, kept = [], [], set()
     for task_data in routine_update.tasks:
-        if task_data.id and task_data.id in existing_tasks_map:
-            # Update existing task
-            existing_task = existing_tasks_map[task_data.id]
-            existing_task.name = task_data.name
-            existing_task.time = task_data.time
-            existing_task.description = task_data.description
-            incoming_task_ids.append(task_data.id)
+        values = {"name": task_data.name, "time": task_data.time, "description": task_data.description}
+        if task_data.id in existing:
+            kept.add(task_data.id)
+            current = existing[task_data.id]
+            if (current.name, current.time, current.description) != (task_data.name, task_data.time, task_data.description):
+                changed.append({"id": task_data.id, **values})
         else:
-            # Create new task
-            new_task = models.RoutineTask(
-                name=task_data.name,
-                time=task_data.time,
-                description=task_data.description,
-                routine_id=routine_id
-            )
-            db.add(new_task)
-            
-    # 3. Delete tasks that are not in the incoming list
-    for task_id, existing_task in existing_tasks_map.items():
-        if task_id not in incoming_task_ids:
-            db.delete(existing_task)
-    
+            added.append({"routine_id": routine_id, **values})
+    removed = existing.keys() - kept
+
+    # Removed tasks take their logs along: note the days they were completed
+    # on so only those are recounted. Streak runs are left as they are; the
+    # new task set applies from the next tick on.
+    removed_days = rollups.completed_log_days(db, removed) if removed else []
+
+    if changed:
+        db.execute(update(models.RoutineTask), changed)
+    if added:
+        db.execute(insert(models.RoutineTask), added)
+    if removed:
+        db.execute(
+            delete(models.RoutineTask).where(models.RoutineTask.id.in_(removed)),
+            execution_options={"synchronize_session": False}
+        )
+
+    rollups.recount_tasks_completed(db, user_id, removed_days)
+    cache.invalidate(db, user_id, "routines", "task_logs")
     db.commit()
-    db.refresh(db_routine)
-    return db_routine
-
-def get_routine_completion_history(db: Session, routine_id: int):
-    # We need to find all dates where *all* tasks of the routine were completed.
-    routine = db.query(models.Routine).filter(models.Routine.id == routine_id).first()
-    if not routine:
-        return []
-    
-    tasks = routine.tasks
-    if not tasks:
-        return []
-    
-    task_ids = [t.id for t in tasks]
-    total_tasks = len(task_ids)
-    
-    # Query to group by date and count completed tasks
-    # We want dates where count(distinct task_id) == total_tasks
-    
-    from sqlalchemy import func
-    
-    results = db.query(
-        models.TaskLog.date,
-        func.count(models.TaskLog.task_id)
+    return get_routine(db, routine_id)
+
+def get_routine_completion_history(db: Session, routine_id: int, date_from=None, date_to=None):
+    # Dates where *all* of the routine's tasks were completed, in one query:
+    # COUNT(DISTINCT task_id) per date must reach the routine's task count,
+    # so a duplicated log for one task can't fake a full day.
+    total_tasks = select(func.count(models.RoutineTask.id)).where(
+        models.RoutineTask.routine_id == routine_id
+    ).scalar_subquery()
+
+    query = db.query(models.TaskLog.date).join(
+        models.RoutineTask, models.RoutineTask.id == models.TaskLog.task_id
     ).filter(
-        models.TaskLog.task_id.in_(task_ids),
+        models.RoutineTask.routine_id == routine_id,
         models.TaskLog.status == 'completed'
-    ).group_by(
+    )
+    query = _date_window(query, models.TaskLog.date, date_from, date_to)
+    results = query.group_by(
         models.TaskLog.date
-    ).all()
-    
-    completed_dates = []
-    for date, count in results:
-        if count >= total_tasks:
-            completed_dates.append(date)
-            
-    return completed_dates
+    ).having(
+        func.count(func.distinct(models.TaskLog.task_id)) == total_tasks
+    ).order_by(models.TaskLog.date).all()
+
+    return [date for (date,) in results]
 
 def delete_routine(db: Session, routine_id: int):
-    db_routine = db.query(models.Routine).filter(models.Routine.id == routine_id).first()
+    # Loaded only for the response. One DELETE removes the routine; its tasks,
+    # their logs and its streak runs follow through ON DELETE CASCADE.
+    db_routine = get_routine(db, routine_id)
     if not db_routine:
         return None
-    db.delete(db_routine)
+    window = rollups.routine_log_window(db, routine_id)
+    db.expunge(db_routine)
+    db.execute(delete(models.Routine).where(models.Routine.id == routine_id))
+    if window:
+        # Its completed tasks and days drop out of the owner's daily stats
+        rollups.rebuild(db, *window)
+    cache.invalidate(db, db_routine.user_id, "routines", "task_logs")
     db.commit()
     return db_routine
 
-def get_routine_task_logs(db: Session, routine_id: int):
-    routine = db.query(models.Routine).filter(models.Routine.id == routine_id).first()
-    if not routine:
-        return []
-    
-    task_ids = [t.id for t in routine.tasks]
-    
-    return db.query(models.TaskLog).filter(
-        models.TaskLog.task_id.in_(task_ids)
-    ).all()
+def _date_window(query, column, date_from=None, date_to=None):
+    # Half-open [date_from, date_to); with task_id IN (...) this is a range
+    # scan on the task_logs (task_id, date) index
+    if date_from:
+        query = query.filter(column >= date_from)
+    if date_to:
+        query = query.filter(column < date_to)
+    return query
+
+def completion_bitmap(dates, date_from, date_to):
+    # One character per day in [date_from, date_to): "1" if completed
+    days = (date_to - date_from).days
+    bits = ["0"] * max(days, 0)
+    for date in dates:
+        index = (date - date_from).days
+        if 0 <= index < days:
+            bits[index] = "1"
+    return "".join(bits)
+
+def get_routine_task_logs(db: Session, routine_id: int, status: str = None, date_from=None, date_to=None, after=None, limit: int = None, fields=None):
+    # One statement: the routine's logs through its tasks, no Routine load
+    query = db.query(models.TaskLog).join(
+        models.RoutineTask, models.RoutineTask.id == models.TaskLog.task_id
+    ).filter(
+        models.RoutineTask.routine_id == routine_id
+    )
+    if status:
+        query = query.filter(models.TaskLog.status == status)
+    query = _date_window(query, models.TaskLog.date, date_from, date_to)
+    query = pagination.project(query, models.TaskLog, fields, TASK_LOG_PAGE_KEY)
+    return pagination.paginate(query, TASK_LOG_PAGE_KEY, after=after, limit=limit).all()
 
 def create_todo(db: Session, todo: schemas.TodoCreate, user_id: int):
     db_todo = models.Todo(**todo.dict(), user_id=user_id)
     db.add(db_todo)
+    rollups.bump_todo(db, user_id, db_todo.due_date, db_todo.status, 1)
+    cache.invalidate(db, user_id, "todos")
     db.commit()
     db.refresh(db_todo)
     return db_todo
 
-def get_todos(db: Session, user_id: int):
-    return db.query(models.Todo).filter(models.Todo.user_id == user_id).all()
+def get_todos(db: Session, user_id: int, status: str = None, due_from=None, due_to=None, after=None, limit: int = None, fields=None):
+    query = db.query(models.Todo).filter(models.Todo.user_id == user_id)
+    if status:
+        query = query.filter(models.Todo.status == status)
+    if due_from:
+        query = query.filter(models.Todo.due_date >= due_from)
+    if due_to:
+        query = query.filter(models.Todo.due_date < due_to)
+    query = pagination.project(query, models.Todo, fields, TODO_PAGE_KEY)
+    return pagination.paginate(query, TODO_PAGE_KEY, after=after, limit=limit).all()
 
 def update_todo(db: Session, todo_id: int, todo_update: schemas.TodoUpdate):
     db_todo = db.query(models.Todo).filter(models.Todo.id == todo_id).first()
     if not db_todo:
         return None
+    old_due_date, old_status = db_todo.due_date, db_todo.status
     
     update_data = todo_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_todo, key, value)
     
+    # Move the todo between rollup buckets if its day or status changed
+    if (old_due_date, old_status) != (db_todo.due_date, db_todo.status):
+        rollups.bump_todo(db, db_todo.user_id, old_due_date, old_status, -1)
+        rollups.bump_todo(db, db_todo.user_id, db_todo.due_date, db_todo.status, 1)
+    
     db.add(db_todo)
+    cache.invalidate(db, db_todo.user_id, "todos")
     db.commit()
     db.refresh(db_todo)
     return db_todo
@@ -340,37 +430,70 @@ def delete_todo(db: Session, todo_id: int):
     db_todo = db.query(models.Todo).filter(models.Todo.id == todo_id).first()
     if not db_todo:
         return None
+    rollups.bump_todo(db, db_todo.user_id, db_todo.due_date, db_todo.status, -1)
     db.delete(db_todo)
+    cache.invalidate(db, db_todo.user_id, "todos")
     db.commit()
     return db_todo
 
-from sqlalchemy import extract, func, cast, Date
+from datetime import date as date_type, timedelta
+
+def _count_by_status(column, status):
+    # COUNT ignores NULLs, so this counts only rows with the given status
+    return func.count(case((column == status, 1)))
+
+def stats_window(filter_type: str, date_from=None, date_to=None, specific_date=None, month=None, year=None):
+    # Half-open [start, end) datetime range for a stats filter, or None for
+    # no date filter. Comparing the bare column keeps the (user_id, due_date)
+    # index usable, unlike cast()/extract() on it.
+    def midnight(day):
+        return datetime.combine(day, datetime.min.time())
 
-def get_todo_stats(db: Session, user_id: int, filter_type: str, date_from=None, date_to=None, specific_date=None, month=None, year=None):
-    query = db.query(models.Todo).filter(models.Todo.user_id == user_id)
-    
     if filter_type == 'today':
         today = datetime.now().date()
-        query = query.filter(cast(models.Todo.due_date, Date) == today)
+        return midnight(today), midnight(today + timedelta(days=1))
     elif filter_type == 'date':
         if specific_date:
-            query = query.filter(cast(models.Todo.due_date, Date) == specific_date)
+            return midnight(specific_date), midnight(specific_date + timedelta(days=1))
     elif filter_type == 'range':
         if date_from and date_to:
-            query = query.filter(cast(models.Todo.due_date, Date) >= date_from, cast(models.Todo.due_date, Date) <= date_to)
+            return midnight(date_from), midnight(date_to + timedelta(days=1))
     elif filter_type == 'month':
         if month and year:
-            query = query.filter(extract('month', models.Todo.due_date) == month, extract('year', models.Todo.due_date) == year)
+            start = date_type(year, month, 1)
+            end = date_type(year + 1, 1, 1) if month == 12 else date_type(year, month + 1, 1)
+            return midnight(start), midnight(end)
     elif filter_type == 'year':
         if year:
-            query = query.filter(extract('year', models.Todo.due_date) == year)
-            
-    todos = query.all()
+            return midnight(date_type(year, 1, 1)), midnight(date_type(year + 1, 1, 1))
+    return None
+
+def get_todo_stats(db: Session, user_id: int, filter_type: str, date_from=None, date_to=None, specific_date=None, month=None, year=None):
+    window = stats_window(filter_type, date_from=date_from, date_to=date_to, specific_date=specific_date, month=month, year=year)
+
+    # Long windows: sum at most 366 daily rollup rows instead of the todos
+    if window and filter_type in ('month', 'year', 'range'):
+        sums = rollups.sum_stats(db, user_id, *window)
+        return {
+            "total": sums["todos_total"],
+            "completed": sums["todos_completed"],
+            "skipped": sums["todos_skipped"],
+            "pending": sums["todos_pending"]
+        }
+
+    # Counted in SQL: one row of four integers, no ORM objects
+    query = db.query(
+        func.count(models.Todo.id),
+        _count_by_status(models.Todo.status, 'completed'),
+        _count_by_status(models.Todo.status, 'skipped'),
+        _count_by_status(models.Todo.status, 'pending')
+    ).filter(models.Todo.user_id == user_id)
     
-    total = len(todos)
-    completed = len([t for t in todos if t.status == 'completed'])
-    skipped = len([t for t in todos if t.status == 'skipped'])
-    pending = len([t for t in todos if t.status == 'pending'])
+    if window:
+        start, end = window
+        query = query.filter(models.Todo.due_date >= start, models.Todo.due_date < end)
+            
+    total, completed, skipped, pending = query.one()
     
     return {
         "total": total,
@@ -382,12 +505,17 @@ def get_todo_stats(db: Session, user_id: int, filter_type: str, date_from=None,
 def create_bucket_list(db: Session, bucket_list: schemas.BucketListCreate, user_id: int):
     db_bucket_list = models.BucketList(**bucket_list.dict(), user_id=user_id)
     db.add(db_bucket_list)
+    cache.invalidate(db, user_id, "bucket_lists")
     db.commit()
     db.refresh(db_bucket_list)
     return db_bucket_list
 
-def get_bucket_lists(db: Session, user_id: int):
-    return db.query(models.BucketList).filter(models.BucketList.user_id == user_id).all()
+def get_bucket_lists(db: Session, user_id: int, status: str = None, after=None, limit: int = None, fields=None):
+    query = db.query(models.BucketList).filter(models.BucketList.user_id == user_id)
+    if status:
+        query = query.filter(models.BucketList.status == status)
+    query = pagination.project(query, models.BucketList, fields, BUCKET_LIST_PAGE_KEY)
+    return pagination.paginate(query, BUCKET_LIST_PAGE_KEY, after=after, limit=limit).all()
 
 def update_bucket_list(db: Session, bucket_list_id: int, bucket_list_update: schemas.BucketListUpdate):
     db_bucket_list = db.query(models.BucketList).filter(models.BucketList.id == bucket_list_id).first()
@@ -399,6 +527,7 @@ def update_bucket_list(db: Session, bucket_list_id: int, bucket_list_update: sch
         setattr(db_bucket_list, key, value)
     
     db.add(db_bucket_list)
+    cache.invalidate(db, db_bucket_list.user_id, "bucket_lists")
     db.commit()
     db.refresh(db_bucket_list)
     return db_bucket_list
@@ -408,16 +537,17 @@ def delete_bucket_list(db: Session, bucket_list_id: int):
     if not db_bucket_list:
         return None
     db.delete(db_bucket_list)
+    cache.invalidate(db, db_bucket_list.user_id, "bucket_lists")
     db.commit()
     return db_bucket_list
 
 def get_bucket_list_stats(db: Session, user_id: int):
-    bucket_lists = db.query(models.BucketList).filter(models.BucketList.user_id == user_id).all()
-    
-    total = len(bucket_lists)
-    completed = len([b for b in bucket_lists if b.status == 'completed'])
-    skipped = len([b for b in bucket_lists if b.status == 'skipped'])
-    waiting = len([b for b in bucket_lists if b.status == 'waiting'])
+    total, completed, skipped, waiting = db.query(
+        func.count(models.BucketList.id),
+        _count_by_status(models.BucketList.status, 'completed'),
+        _count_by_status(models.BucketList.status, 'skipped'),
+        _count_by_status(models.BucketList.status, 'waiting')
+    ).filter(models.BucketList.user_id == user_id).one()
     
     return {
         "total": total,
@@ -1,8 +1,15 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-import crud, models, schemas
-from database import SessionLocal, engine
+from pydantic import TypeAdapter
+from typing import Optional
+import hashlib
+import crud, models, schemas, database, auth, rollups, pagination, cache, metrics
+from database import engine, get_db
 
 models.Base.metadata.create_all(bind=engine)
 
@@ -14,152 +21,425 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument(database.async_engine.sync_engine if database.async_engine else engine)
+
+async def run_db(db, fn, **kwargs):
+    # crud functions are written against a sync Session. In async mode they run
+    # on the AsyncSession's greenlet (non-blocking driver); otherwise they run
+    # in the threadpool so the event loop never waits on the database.
+    if database.ASYNC_DB:
+        return await db.run_sync(lambda session: fn(session, **kwargs))
+    return await run_in_threadpool(fn, db, **kwargs)
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    # Verified from the JWT alone; tokens carry the user id in "uid", so
+    # authenticated requests cost no extra queries.
+    credentials_exception = HTTPException(
+        status_code=401,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    claims = auth.decode_access_token(token) if token else None
+    if claims is None:
+        raise credentials_exception
+
+    if "uid" in claims:
+        return schemas.CurrentUser(id=claims["uid"], username=claims["sub"])
+
+    # Older tokens only name the user: resolve once, then serve from cache
+    principal = auth.principal_cache.get(claims["sub"])
+    if principal is None:
+        db_user = await run_db(db, crud.get_user_by_username, username=claims["sub"])
+        if db_user is None:
+            raise credentials_exception
+        principal = schemas.CurrentUser(id=db_user.id, username=db_user.username)
+        auth.principal_cache.set(claims["sub"], principal)
+    return principal
+
+async def current_user_if_required(token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    # The token's user when AUTH_REQUIRED is set (401 without a valid one), else None
+    if not auth.AUTH_REQUIRED:
+        return None
+    return await get_current_user(token=token, db=db)
+
+def check_owner(current_user: Optional[schemas.CurrentUser], *owner_ids):
+    # Missing rows (owner None) are left to the route's own 404
+    if current_user is not None and any(owner is not None and owner != current_user.id for owner in owner_ids):
+        raise HTTPException(status_code=403, detail="Not allowed to access this user")
+
+async def authorize_user(user_id: int, current_user: Optional[schemas.CurrentUser] = Depends(current_user_if_required)):
+    check_owner(current_user, user_id)
+
+# Routes addressed by a row id rather than /users/{user_id}: the row's owner
+# must be the token's user
+
+async def authorize_routine(routine_id: int, current_user: Optional[schemas.CurrentUser] = Depends(current_user_if_required), db: Session = Depends(get_db)):
+    if current_user is not None:
+        check_owner(current_user, await run_db(db, crud.get_owner, model=models.Routine, id=routine_id))
+
+async def authorize_task(task_id: int, current_user: Optional[schemas.CurrentUser] = Depends(current_user_if_required), db: Session = Depends(get_db)):
+    if current_user is not None:
+        check_owner(current_user, *await run_db(db, crud.get_task_owners, task_ids=[task_id]))
+
+async def authorize_goal(goal_id: int, current_user: Optional[schemas.CurrentUser] = Depends(current_user_if_required), db: Session = Depends(get_db)):
+    if current_user is not None:
+        check_owner(current_user, await run_db(db, crud.get_owner, model=models.Goal, id=goal_id))
+
+async def authorize_todo(todo_id: int, current_user: Optional[schemas.CurrentUser] = Depends(current_user_if_required), db: Session = Depends(get_db)):
+    if current_user is not None:
+        check_owner(current_user, await run_db(db, crud.get_owner, model=models.Todo, id=todo_id))
+
+async def authorize_bucket_list(bucket_list_id: int, current_user: Optional[schemas.CurrentUser] = Depends(current_user_if_required), db: Session = Depends(get_db)):
+    if current_user is not None:
+        check_owner(current_user, await run_db(db, crud.get_owner, model=models.BucketList, id=bucket_list_id))
+
+class ListParams:
+    # Shared keyset pagination / projection query parameters for list endpoints
+    def __init__(
+        self,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_LIMIT),
+        fields: Optional[str] = None,
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.fields = fields
+
+    def is_default(self):
+        # Plain "give me everything" request: no cursor, limit or projection
+        return not (self.cursor or self.limit or self.fields)
+
+    def parse(self, schema, key_columns):
+        # Returns (after, fields) for crud, or raises 400
+        try:
+            after = pagination.decode_cursor(self.cursor, key_columns) if self.cursor else None
+            fields = pagination.parse_fields(self.fields, schema)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return after, fields
+
+def list_response(response: Response, rows, key_columns, limit, fields):
+    # Next page cursor goes in a header so the body stays a plain list
+    headers = {}
+    cursor = pagination.next_cursor(rows, key_columns, limit)
+    if cursor:
+        headers["X-Next-Cursor"] = cursor
+    if fields:
+        content = jsonable_encoder([{name: getattr(row, name) for name in fields} for row in rows])
+        return JSONResponse(content, headers=headers)
+    response.headers.update(headers)
+    return rows
+
+_adapters = {}
+
+def to_jsonable(response_type, value):
+    # Serialize ORM results the way response_model would, so the cache holds
+    # plain JSON data rather than objects bound to a session
+    adapter = _adapters.get(response_type)
+    if adapter is None:
+        adapter = _adapters[response_type] = TypeAdapter(response_type)
+    return adapter.dump_python(adapter.validate_python(value, from_attributes=True), mode="json")
+
+def weak_etag(endpoint: str, versions, params: dict = None):
+    digest = hashlib.sha1(repr((endpoint, versions, sorted((params or {}).items()))).encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str):
+    if not if_none_match:
+        return False
+    # Weak comparison: W/ prefixes are ignored
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+async def cached(request: Request, db, endpoint: str, user_id: int, collections, response_type, load, params: dict = None):
+    # Per-user read. The versions of the collections it reads (one indexed
+    # lookup, shared by all workers) give a weak ETag, so a matching
+    # If-None-Match is answered 304 without loading anything; otherwise the
+    # body comes from cache.response_cache or `load`. Versions are taken
+    # before loading, so a write committed meanwhile makes this entry
+    # unreachable.
+    versions = await run_db(db, cache.versions, user_id=user_id, collections=collections)
+    # no-cache: browsers keep the body but revalidate it on every fetch
+    headers = {"ETag": weak_etag(endpoint, versions, params), "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    key = cache.response_cache.key(endpoint, user_id, versions, params)
+    content = cache.response_cache.get(key) if cache.response_cache.enabled else None
+    if content is None:
+        content = to_jsonable(response_type, await load())
+        if cache.response_cache.enabled:
+            cache.response_cache.set(key, content)
+    return JSONResponse(content, headers=headers)
 
 @app.get("/", tags=["General"])
-def read_root():
+async def read_root():
     return {"message": "Welcome to Routine Tracker API"}
 
+@app.get("/metrics", tags=["General"], response_class=PlainTextResponse)
+async def read_metrics():
+    # Prometheus text format; only populated with METRICS_ENABLED
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return metrics.render()
+
+@app.get("/metrics/pool", tags=["General"])
+async def read_pool_metrics():
+    return database.pool_status()
+
 @app.post("/users/", response_model=schemas.User, tags=["Users"])
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    db_user = await run_db(db, crud.get_user_by_email, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    hashed_password = await auth.get_password_hash_async(user.password)
+    return await run_db(db, crud.create_user, user=user, hashed_password=hashed_password)
 
-@app.get("/users/{user_id}", response_model=schemas.User, tags=["Users"])
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
+@app.get("/users/me", response_model=schemas.User, tags=["Users"])
+async def read_current_user(current_user: schemas.CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    db_user = await run_db(db, crud.get_user, user_id=current_user.id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
-@app.put("/users/{user_id}", response_model=schemas.User, tags=["Users"])
-def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Depends(get_db)):
-    db_user = crud.update_user(db, user_id=user_id, user_update=user_update)
+@app.get("/users/{user_id}", response_model=schemas.User, tags=["Users"], dependencies=[Depends(authorize_user)])
+async def read_user(user_id: int, request: Request, db: Session = Depends(get_db)):
+    async def load():
+        db_user = await run_db(db, crud.get_user, user_id=user_id)
+        if db_user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return db_user
+    return await cached(request, db, "user", user_id, ["user", "routines", "goals"], schemas.User, load)
+
+@app.put("/users/{user_id}", response_model=schemas.User, tags=["Users"], dependencies=[Depends(authorize_user)])
+async def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Depends(get_db)):
+    db_user = await run_db(db, crud.update_user, user_id=user_id, user_update=user_update)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
-@app.post("/users/{user_id}/routines/", response_model=schemas.Routine, tags=["Routines"])
-def create_routine_for_user(
+@app.delete("/users/{user_id}", tags=["Users"])
+async def delete_user(user_id: int, current_user: schemas.CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    # Irreversible and cascades to everything the account owns: always needs
+    # the account's own token, whatever AUTH_REQUIRED says
+    if current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Not allowed to access this user")
+    success = await run_db(db, crud.delete_user, user_id=user_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"status": "success"}
+
+@app.post("/users/{user_id}/routines/", response_model=schemas.Routine, tags=["Routines"], dependencies=[Depends(authorize_user)])
+async def create_routine_for_user(
     user_id: int, routine: schemas.RoutineCreate, db: Session = Depends(get_db)
 ):
-    return crud.create_routine(db=db, routine=routine, user_id=user_id)
+    return await run_db(db, crud.create_routine, routine=routine, user_id=user_id)
 
-    return crud.create_routine(db=db, routine=routine, user_id=user_id)
+    return await run_db(db, crud.create_routine, routine=routine, user_id=user_id)
 
-@app.get("/users/{user_id}/routines/", response_model=list[schemas.Routine], tags=["Routines"])
-def read_routines(user_id: int, db: Session = Depends(get_db)):
-    return crud.get_routines(db=db, user_id=user_id)
+@app.get("/users/{user_id}/routines/", response_model=list[schemas.Routine], tags=["Routines"], dependencies=[Depends(authorize_user)])
+async def read_routines(user_id: int, request: Request, db: Session = Depends(get_db)):
+    return await cached(
+        request, db,
+        "routines", user_id, ["routines"], list[schemas.Routine],
+        lambda: run_db(db, crud.get_routines, user_id=user_id)
+    )
 
-@app.put("/routines/{routine_id}", response_model=schemas.Routine, tags=["Routines"])
-def update_routine(routine_id: int, routine: schemas.RoutineCreate, db: Session = Depends(get_db)):
-    db_routine = crud.update_routine(db, routine_id=routine_id, routine_update=routine)
+@app.put("/routines/{routine_id}", response_model=schemas.Routine, tags=["Routines"], dependencies=[Depends(authorize_routine)])
+async def update_routine(routine_id: int, routine: schemas.RoutineCreate, db: Session = Depends(get_db)):
+    db_routine = await run_db(db, crud.update_routine, routine_id=routine_id, routine_update=routine)
     if db_routine is None:
         raise HTTPException(status_code=404, detail="Routine not found")
     return db_routine
 
-@app.delete("/routines/{routine_id}", response_model=schemas.Routine, tags=["Routines"])
-def delete_routine(routine_id: int, db: Session = Depends(get_db)):
-    db_routine = crud.delete_routine(db, routine_id=routine_id)
+@app.delete("/routines/{routine_id}", response_model=schemas.Routine, tags=["Routines"], dependencies=[Depends(authorize_routine)])
+async def delete_routine(routine_id: int, db: Session = Depends(get_db)):
+    db_routine = await run_db(db, crud.delete_routine, routine_id=routine_id)
     if db_routine is None:
         raise HTTPException(status_code=404, detail="Routine not found")
     return db_routine
 
-from datetime import datetime, date
-
-from typing import Optional
-
-@app.get("/routines/{routine_id}/history", response_model=list[datetime], tags=["Routines"])
-def get_routine_history(routine_id: int, db: Session = Depends(get_db)):
-    return crud.get_routine_completion_history(db, routine_id=routine_id)
+from datetime import datetime, date, timedelta
 
-@app.get("/routines/{routine_id}/logs", response_model=list[schemas.TaskLog], tags=["Routines"])
-def get_routine_logs(routine_id: int, db: Session = Depends(get_db)):
-    return crud.get_routine_task_logs(db, routine_id=routine_id)
-
-@app.post("/tasks/{task_id}/complete", response_model=schemas.TaskLog, tags=["Tasks"])
-def complete_task(task_id: int, status: str = "completed", date_str: Optional[str] = None, db: Session = Depends(get_db)):
+def parse_log_date(date_str: Optional[str]):
+    # Task logs are keyed by the day at midnight; default to today
     if date_str:
         try:
-            log_date = datetime.strptime(date_str, "%Y-%m-%d")
+            return datetime.strptime(date_str, "%Y-%m-%d")
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-    else:
-        today = date.today()
-        log_date = datetime.combine(today, datetime.min.time())
-        
-    return crud.create_task_log(db=db, task_id=task_id, date=log_date, status=status)
-
-@app.delete("/tasks/{task_id}/complete", tags=["Tasks"])
-def uncomplete_task(task_id: int, date_str: Optional[str] = None, db: Session = Depends(get_db)):
-    if date_str:
-        try:
-            log_date = datetime.strptime(date_str, "%Y-%m-%d")
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-    else:
-        today = date.today()
-        log_date = datetime.combine(today, datetime.min.time())
-        
-    success = crud.delete_task_log(db=db, task_id=task_id, date=log_date)
+    return datetime.combine(date.today(), datetime.min.time())
+
+def parse_date_window(date_from: Optional[str], date_to: Optional[str]):
+    # Inclusive from/to days -> half-open [start, end) datetimes
+    start = parse_log_date(date_from) if date_from else None
+    try:
+        end = parse_log_date(date_to) + timedelta(days=1) if date_to else None
+    except OverflowError:
+        raise HTTPException(status_code=400, detail="'to' is out of range")
+    return start, end
+
+# One calendar year, leap or not: the longest window the UI asks for
+MAX_BITMAP_DAYS = 366
+
+@app.get("/routines/{routine_id}/history", response_model=list[datetime], tags=["Routines"], dependencies=[Depends(authorize_routine)])
+async def get_routine_history(
+    routine_id: int,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    db: Session = Depends(get_db)
+):
+    start, end = parse_date_window(date_from, date_to)
+    return await run_db(db, crud.get_routine_completion_history, routine_id=routine_id, date_from=start, date_to=end)
+
+@app.get("/routines/{routine_id}/history/bitmap", response_model=schemas.CompletionBitmap, tags=["Routines"], dependencies=[Depends(authorize_routine)])
+async def get_routine_history_bitmap(
+    routine_id: int,
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to"),
+    db: Session = Depends(get_db)
+):
+    start, end = parse_date_window(date_from, date_to)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end - start).days > MAX_BITMAP_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BITMAP_DAYS} days per request")
+    dates = await run_db(db, crud.get_routine_completion_history, routine_id=routine_id, date_from=start, date_to=end)
+    return {"date_from": start, "date_to": end - timedelta(days=1), "days": crud.completion_bitmap(dates, start, end)}
+
+@app.get("/routines/{routine_id}/logs", response_model=list[schemas.TaskLog], tags=["Routines"], dependencies=[Depends(authorize_routine)])
+async def get_routine_logs(
+    routine_id: int,
+    response: Response,
+    status: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    params: ListParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    after, fields = params.parse(schemas.TaskLog, crud.TASK_LOG_PAGE_KEY)
+    start, end = parse_date_window(date_from, date_to)
+    db_logs = await run_db(
+        db,
+        crud.get_routine_task_logs,
+        routine_id=routine_id,
+        status=status,
+        date_from=start,
+        date_to=end,
+        after=after,
+        limit=params.limit,
+        fields=fields
+    )
+    return list_response(response, db_logs, crud.TASK_LOG_PAGE_KEY, params.limit, fields)
+
+@app.post("/tasks/{task_id}/complete", response_model=schemas.TaskLog, tags=["Tasks"], dependencies=[Depends(authorize_task)])
+async def complete_task(task_id: int, status: str = "completed", date_str: Optional[str] = None, db: Session = Depends(get_db)):
+    log_date = parse_log_date(date_str)
+    db_log = await run_db(db, crud.create_task_log, task_id=task_id, date=log_date, status=status)
+    if db_log is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return db_log
+
+@app.post("/routines/{routine_id}/complete", response_model=list[schemas.TaskLog], tags=["Routines"], dependencies=[Depends(authorize_routine)])
+async def complete_routine(routine_id: int, status: str = "completed", date_str: Optional[str] = None, db: Session = Depends(get_db)):
+    log_date = parse_log_date(date_str)
+    db_logs = await run_db(db, crud.complete_routine, routine_id=routine_id, date=log_date, status=status)
+    if db_logs is None:
+        raise HTTPException(status_code=404, detail="Routine not found")
+    return db_logs
+
+@app.post("/tasks/complete:batch", response_model=list[schemas.TaskLog], tags=["Tasks"])
+async def complete_tasks_batch(
+    logs: list[schemas.TaskLogCreate],
+    current_user: Optional[schemas.CurrentUser] = Depends(current_user_if_required),
+    db: Session = Depends(get_db)
+):
+    if current_user is not None and logs:
+        check_owner(current_user, *await run_db(db, crud.get_task_owners, task_ids={log.task_id for log in logs}))
+    entries = [
+        (log.task_id, datetime.combine(log.date.date(), datetime.min.time()), log.status)
+        for log in logs
+    ]
+    db_logs = await run_db(db, crud.create_task_logs, entries=entries)
+    if db_logs is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return db_logs
+
+@app.delete("/tasks/{task_id}/complete", tags=["Tasks"], dependencies=[Depends(authorize_task)])
+async def uncomplete_task(task_id: int, date_str: Optional[str] = None, db: Session = Depends(get_db)):
+    log_date = parse_log_date(date_str)
+    success = await run_db(db, crud.delete_task_log, task_id=task_id, date=log_date)
     if not success:
         raise HTTPException(status_code=404, detail="Task log not found")
     return {"status": "success"}
 
-@app.get("/users/{user_id}/tasks/today", response_model=list[schemas.TaskLog], tags=["Tasks"])
-def read_today_task_logs(user_id: int, db: Session = Depends(get_db)):
+@app.get("/users/{user_id}/tasks/today", response_model=list[schemas.TaskLog], tags=["Tasks"], dependencies=[Depends(authorize_user)])
+async def read_today_task_logs(user_id: int, request: Request, db: Session = Depends(get_db)):
+    today = date.today()
+    log_date = datetime.combine(today, datetime.min.time())
+    return await cached(
+        request, db,
+        "today_logs", user_id, ["task_logs"], list[schemas.TaskLog],
+        lambda: run_db(db, crud.get_today_task_logs, user_id=user_id, date=log_date),
+        params={"date": today.isoformat()}
+    )
+
+@app.get("/users/{user_id}/dashboard", response_model=schemas.Dashboard, tags=["Dashboard"], dependencies=[Depends(authorize_user)])
+async def read_dashboard(user_id: int, request: Request, db: Session = Depends(get_db)):
     today = date.today()
     log_date = datetime.combine(today, datetime.min.time())
-    return crud.get_today_task_logs(db=db, user_id=user_id, date=log_date)
+    return await cached(
+        request, db,
+        "dashboard", user_id, ["goals", "routines", "task_logs", "todos"], schemas.Dashboard,
+        lambda: run_db(db, crud.get_dashboard, user_id=user_id, date=log_date),
+        params={"date": today.isoformat()}
+    )
 
-@app.post("/users/{user_id}/goals/", response_model=schemas.Goal, tags=["Goals"])
-def create_goal_for_user(
+@app.post("/users/{user_id}/goals/", response_model=schemas.Goal, tags=["Goals"], dependencies=[Depends(authorize_user)])
+async def create_goal_for_user(
     user_id: int, goal: schemas.GoalCreate, db: Session = Depends(get_db)
 ):
-    return crud.create_goal(db=db, goal=goal, user_id=user_id)
-
-@app.get("/users/{user_id}/goals/", response_model=list[schemas.Goal], tags=["Goals"])
-def read_goals(user_id: int, db: Session = Depends(get_db)):
-    return crud.get_goals(db=db, user_id=user_id)
+    return await run_db(db, crud.create_goal, goal=goal, user_id=user_id)
+
+@app.get("/users/{user_id}/goals/", response_model=list[schemas.Goal], tags=["Goals"], dependencies=[Depends(authorize_user)])
+async def read_goals(user_id: int, request: Request, response: Response, status: Optional[str] = None, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    if params.is_default():
+        return await cached(
+            request, db,
+            "goals", user_id, ["goals"], list[schemas.Goal],
+            lambda: run_db(db, crud.get_goals, user_id=user_id, status=status),
+            params={"status": status}
+        )
+    after, fields = params.parse(schemas.Goal, crud.GOAL_PAGE_KEY)
+    db_goals = await run_db(db, crud.get_goals, user_id=user_id, status=status, after=after, limit=params.limit, fields=fields)
+    return list_response(response, db_goals, crud.GOAL_PAGE_KEY, params.limit, fields)
 
-@app.put("/goals/{goal_id}", response_model=schemas.Goal, tags=["Goals"])
-def update_goal(goal_id: int, goal_update: schemas.GoalUpdate, db: Session = Depends(get_db)):
-    db_goal = crud.update_goal(db, goal_id=goal_id, goal_update=goal_update)
+@app.put("/goals/{goal_id}", response_model=schemas.Goal, tags=["Goals"], dependencies=[Depends(authorize_goal)])
+async def update_goal(goal_id: int, goal_update: schemas.GoalUpdate, db: Session = Depends(get_db)):
+    db_goal = await run_db(db, crud.update_goal, goal_id=goal_id, goal_update=goal_update)
     if db_goal is None:
         raise HTTPException(status_code=404, detail="Goal not found")
     return db_goal
 
-@app.delete("/goals/{goal_id}", response_model=schemas.Goal, tags=["Goals"])
-def delete_goal(goal_id: int, db: Session = Depends(get_db)):
-    db_goal = crud.delete_goal(db, goal_id=goal_id)
+@app.delete("/goals/{goal_id}", response_model=schemas.Goal, tags=["Goals"], dependencies=[Depends(authorize_goal)])
+async def delete_goal(goal_id: int, db: Session = Depends(get_db)):
+    db_goal = await run_db(db, crud.delete_goal, goal_id=goal_id)
     if db_goal is None:
         raise HTTPException(status_code=404, detail="Goal not found")
     return db_goal
 
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from datetime import timedelta
-import auth
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
 @app.post("/token", tags=["Auth"])
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username) # Using email as username for login
-    if not user:
-        # Try username if email fails
-        user = db.query(models.User).filter(models.User.username == form_data.username).first()
-        
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    # Using email or username for login
+    user = await run_db(db, crud.get_user_by_login, login=form_data.username)
+    if not user or not await auth.verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=401,
             detail="Incorrect username or password",
@@ -167,61 +447,96 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         )
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer", "user_id": user.id, "full_name": user.full_name}
 
-from fastapi.staticfiles import StaticFiles
-from fastapi import UploadFile, File
-import shutil
-import uuid
+import uploads
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", uploads.ContentAddressedStaticFiles(directory="static"), name="static")
 
-@app.post("/upload", tags=["Upload"])
-async def upload_image(file: UploadFile = File(...)):
-    file_extension = file.filename.split(".")[-1]
-    file_name = f"{uuid.uuid4()}.{file_extension}"
-    file_path = f"static/images/{file_name}"
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    return {"url": f"http://localhost:8002/{file_path}"}
-
-@app.post("/users/{user_id}/todos/", response_model=schemas.Todo, tags=["Todos"])
-def create_todo_for_user(
+@app.post("/upload", tags=["Upload"], openapi_extra=uploads.OPENAPI_BODY)
+async def upload_image(request: Request):
+    # The body is streamed to disk by uploads, not parsed into an UploadFile
+    try:
+        names = await uploads.save_upload(request)
+    except uploads.UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"File too large. Maximum size is {uploads.MAX_UPLOAD_BYTES} bytes")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Profile pictures should use thumbnail_url (the small WebP avatar)
+    return {
+        "url": uploads.public_url(names["original"]),
+        "thumbnail_url": uploads.public_url(names["avatar"]),
+        "variants": {name: uploads.public_url(names[name]) for name in uploads.VARIANTS},
+    }
+
+@app.post("/users/{user_id}/todos/", response_model=schemas.Todo, tags=["Todos"], dependencies=[Depends(authorize_user)])
+async def create_todo_for_user(
     user_id: int, todo: schemas.TodoCreate, db: Session = Depends(get_db)
 ):
-    return crud.create_todo(db=db, todo=todo, user_id=user_id)
-
-@app.get("/users/{user_id}/todos/", response_model=list[schemas.Todo], tags=["Todos"])
-def read_todos(user_id: int, db: Session = Depends(get_db)):
-    return crud.get_todos(db=db, user_id=user_id)
+    return await run_db(db, crud.create_todo, todo=todo, user_id=user_id)
+
+@app.get("/users/{user_id}/todos/", response_model=list[schemas.Todo], tags=["Todos"], dependencies=[Depends(authorize_user)])
+async def read_todos(
+    user_id: int,
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    due_from: Optional[str] = None,
+    due_to: Optional[str] = None,
+    params: ListParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    # due_to is inclusive of the whole day
+    p_due_from, p_due_to = parse_date_window(due_from, due_to)
+    if params.is_default():
+        return await cached(
+            request, db,
+            "todos", user_id, ["todos"], list[schemas.Todo],
+            lambda: run_db(db, crud.get_todos, user_id=user_id, status=status, due_from=p_due_from, due_to=p_due_to),
+            params={"status": status, "due_from": due_from, "due_to": due_to}
+        )
+    after, fields = params.parse(schemas.Todo, crud.TODO_PAGE_KEY)
+    db_todos = await run_db(
+        db,
+        crud.get_todos,
+        user_id=user_id,
+        status=status,
+        due_from=p_due_from,
+        due_to=p_due_to,
+        after=after,
+        limit=params.limit,
+        fields=fields
+    )
+    return list_response(response, db_todos, crud.TODO_PAGE_KEY, params.limit, fields)
 
-@app.put("/todos/{todo_id}", response_model=schemas.Todo, tags=["Todos"])
-def update_todo(todo_id: int, todo_update: schemas.TodoUpdate, db: Session = Depends(get_db)):
-    db_todo = crud.update_todo(db, todo_id=todo_id, todo_update=todo_update)
+@app.put("/todos/{todo_id}", response_model=schemas.Todo, tags=["Todos"], dependencies=[Depends(authorize_todo)])
+async def update_todo(todo_id: int, todo_update: schemas.TodoUpdate, db: Session = Depends(get_db)):
+    db_todo = await run_db(db, crud.update_todo, todo_id=todo_id, todo_update=todo_update)
     if db_todo is None:
         raise HTTPException(status_code=404, detail="Todo not found")
     return db_todo
 
-@app.delete("/todos/{todo_id}", response_model=schemas.Todo, tags=["Todos"])
-def delete_todo(todo_id: int, db: Session = Depends(get_db)):
-    db_todo = crud.delete_todo(db, todo_id=todo_id)
+@app.delete("/todos/{todo_id}", response_model=schemas.Todo, tags=["Todos"], dependencies=[Depends(authorize_todo)])
+async def delete_todo(todo_id: int, db: Session = Depends(get_db)):
+    db_todo = await run_db(db, crud.delete_todo, todo_id=todo_id)
     if db_todo is None:
         raise HTTPException(status_code=404, detail="Todo not found")
     return db_todo
 
-@app.get("/users/{user_id}/todos/stats", response_model=schemas.TodoStats, tags=["Todos"])
-def get_todo_stats(
+@app.get("/users/{user_id}/todos/stats", response_model=schemas.TodoStats, tags=["Todos"], dependencies=[Depends(authorize_user)])
+async def get_todo_stats(
     user_id: int, 
+    request: Request,
     filter_type: str, 
     date_from: Optional[str] = None, 
     date_to: Optional[str] = None, 
     specific_date: Optional[str] = None, 
-    month: Optional[int] = None, 
-    year: Optional[int] = None, 
+    month: Optional[int] = Query(None, ge=1, le=12),
+    # The window ends on Jan 1 of the next year, so 9999 can't be represented
+    year: Optional[int] = Query(None, ge=1, le=9998),
     db: Session = Depends(get_db)
 ):
     # Parse dates if provided
@@ -229,8 +544,9 @@ def get_todo_stats(
     p_date_to = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else None
     p_specific_date = datetime.strptime(specific_date, "%Y-%m-%d").date() if specific_date else None
     
-    return crud.get_todo_stats(
-        db=db, 
+    load = lambda: run_db(
+        db,
+        crud.get_todo_stats,
         user_id=user_id, 
         filter_type=filter_type, 
         date_from=p_date_from, 
@@ -239,31 +555,66 @@ def get_todo_stats(
         month=month, 
         year=year
     )
+    if filter_type == 'today':
+        # "today" moves at midnight; key on the actual day
+        specific_date = date.today().isoformat()
+    return await cached(
+        request, db,
+        "todo_stats", user_id, ["todos"], schemas.TodoStats, load,
+        params={
+            "filter_type": filter_type, "date_from": date_from, "date_to": date_to,
+            "specific_date": specific_date, "month": month, "year": year
+        }
+    )
+
+@app.get("/users/{user_id}/stats/daily", response_model=list[schemas.DailyUserStats], tags=["Stats"], dependencies=[Depends(authorize_user)])
+async def read_daily_stats(user_id: int, date_from: str, date_to: str, request: Request, db: Session = Depends(get_db)):
+    start = parse_log_date(date_from)
+    end = parse_log_date(date_to) + timedelta(days=1)
+    return await cached(
+        request, db,
+        "daily_stats", user_id, ["todos", "task_logs", "routines"], list[schemas.DailyUserStats],
+        lambda: run_db(db, rollups.get_daily_stats, user_id=user_id, start=start, end=end),
+        params={"date_from": date_from, "date_to": date_to}
+    )
 
-@app.post("/users/{user_id}/bucketlists/", response_model=schemas.BucketList, tags=["BucketLists"])
-def create_bucket_list(
+@app.post("/users/{user_id}/bucketlists/", response_model=schemas.BucketList, tags=["BucketLists"], dependencies=[Depends(authorize_user)])
+async def create_bucket_list(
     user_id: int, bucket_list: schemas.BucketListCreate, db: Session = Depends(get_db)
 ):
-    return crud.create_bucket_list(db=db, bucket_list=bucket_list, user_id=user_id)
-
-@app.get("/users/{user_id}/bucketlists/", response_model=list[schemas.BucketList], tags=["BucketLists"])
-def read_bucket_lists(user_id: int, db: Session = Depends(get_db)):
-    return crud.get_bucket_lists(db=db, user_id=user_id)
+    return await run_db(db, crud.create_bucket_list, bucket_list=bucket_list, user_id=user_id)
+
+@app.get("/users/{user_id}/bucketlists/", response_model=list[schemas.BucketList], tags=["BucketLists"], dependencies=[Depends(authorize_user)])
+async def read_bucket_lists(user_id: int, request: Request, response: Response, status: Optional[str] = None, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    if params.is_default():
+        return await cached(
+            request, db,
+            "bucket_lists", user_id, ["bucket_lists"], list[schemas.BucketList],
+            lambda: run_db(db, crud.get_bucket_lists, user_id=user_id, status=status),
+            params={"status": status}
+        )
+    after, fields = params.parse(schemas.BucketList, crud.BUCKET_LIST_PAGE_KEY)
+    db_bucket_lists = await run_db(db, crud.get_bucket_lists, user_id=user_id, status=status, after=after, limit=params.limit, fields=fields)
+    return list_response(response, db_bucket_lists, crud.BUCKET_LIST_PAGE_KEY, params.limit, fields)
 
-@app.put("/bucketlists/{bucket_list_id}", response_model=schemas.BucketList, tags=["BucketLists"])
-def update_bucket_list(bucket_list_id: int, bucket_list_update: schemas.BucketListUpdate, db: Session = Depends(get_db)):
-    db_bucket_list = crud.update_bucket_list(db, bucket_list_id=bucket_list_id, bucket_list_update=bucket_list_update)
+@app.put("/bucketlists/{bucket_list_id}", response_model=schemas.BucketList, tags=["BucketLists"], dependencies=[Depends(authorize_bucket_list)])
+async def update_bucket_list(bucket_list_id: int, bucket_list_update: schemas.BucketListUpdate, db: Session = Depends(get_db)):
+    db_bucket_list = await run_db(db, crud.update_bucket_list, bucket_list_id=bucket_list_id, bucket_list_update=bucket_list_update)
     if db_bucket_list is None:
         raise HTTPException(status_code=404, detail="BucketList not found")
     return db_bucket_list
 
-@app.delete("/bucketlists/{bucket_list_id}", response_model=schemas.BucketList, tags=["BucketLists"])
-def delete_bucket_list(bucket_list_id: int, db: Session = Depends(get_db)):
-    db_bucket_list = crud.delete_bucket_list(db, bucket_list_id=bucket_list_id)
+@app.delete("/bucketlists/{bucket_list_id}", response_model=schemas.BucketList, tags=["BucketLists"], dependencies=[Depends(authorize_bucket_list)])
+async def delete_bucket_list(bucket_list_id: int, db: Session = Depends(get_db)):
+    db_bucket_list = await run_db(db, crud.delete_bucket_list, bucket_list_id=bucket_list_id)
     if db_bucket_list is None:
         raise HTTPException(status_code=404, detail="BucketList not found")
     return db_bucket_list
 
-@app.get("/users/{user_id}/bucketlists/stats", response_model=schemas.BucketListStats, tags=["BucketLists"])
-def get_bucket_list_stats(user_id: int, db: Session = Depends(get_db)):
-    return crud.get_bucket_list_stats(db=db, user_id=user_id)
+@app.get("/users/{user_id}/bucketlists/stats", response_model=schemas.BucketListStats, tags=["BucketLists"], dependencies=[Depends(authorize_user)])
+async def get_bucket_list_stats(user_id: int, request: Request, db: Session = Depends(get_db)):
+    return await cached(
+        request, db,
+        "bucket_list_stats", user_id, ["bucket_lists"], schemas.BucketListStats,
+        lambda: run_db(db, crud.get_bucket_list_stats, user_id=user_id)
+    )
@@ -0,0 +1,136 @@
+from contextvars import ContextVar
+from sqlalchemy import event
+import bisect
+import logging
+import os
+import threading
+import time
+
+# Opt-in request instrumentation. MetricsMiddleware times each request and,
+# through engine events, counts and times the SQL statements it issued, then
+# folds them into per-route histograms rendered in the Prometheus text format
+# at /metrics. Requests slower than METRICS_SLOW_REQUEST_MS are logged with
+# their statements, which is how N+1 patterns show up.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+METRICS_SLOW_REQUEST_MS = float(os.getenv("METRICS_SLOW_REQUEST_MS", 500))
+
+logger = logging.getLogger("metrics")
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+class RequestQueries:
+    # SQL issued while serving one request
+    def __init__(self):
+        self.statements = []
+        self.seconds = 0.0
+
+    def record(self, statement: str, seconds: float):
+        self.statements.append((statement, seconds))
+        self.seconds += seconds
+
+# Set by the middleware for the duration of a request. Threadpool and
+# run_sync calls inherit the context, so their statements land here too.
+current_queries = ContextVar("current_queries", default=None)
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(s["counts"]), s["sum"]) for labels, s in self._series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            base = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+def _escape(value: str):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+LABELS = ("method", "route")
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route.", SECONDS_BUCKETS
+)
+request_statements = Histogram(
+    "http_request_sql_statements", "SQL statements issued per request by route.", STATEMENT_BUCKETS
+)
+request_sql_duration = Histogram(
+    "http_request_sql_duration_seconds", "Time spent in SQL per request by route.", SECONDS_BUCKETS
+)
+
+def render():
+    lines = []
+    for histogram in (request_duration, request_statements, request_sql_duration):
+        lines.extend(histogram.render(LABELS))
+    return "\n".join(lines) + "\n"
+
+def instrument(engine):
+    """Attribute `engine`'s statements to the request being served."""
+    # The start time lives on the statement's execution context, so a
+    # statement that raises leaves nothing behind on the connection
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and current_queries.get() is not None:
+            context._metrics_query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        queries = current_queries.get()
+        start = getattr(context, "_metrics_query_start", None)
+        if queries is not None and start is not None:
+            queries.record(statement, time.perf_counter() - start)
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        token = current_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_queries.reset(token)
+            self.observe(scope, queries, elapsed)
+
+    def observe(self, scope, queries: RequestQueries, elapsed: float):
+        # Label by route template, never the raw path, to keep series bounded
+        route = scope.get("route")
+        labels = (scope["method"], getattr(route, "path", "unmatched"))
+        request_duration.observe(labels, elapsed)
+        request_statements.observe(labels, len(queries.statements))
+        request_sql_duration.observe(labels, queries.seconds)
+
+        if elapsed * 1000 >= METRICS_SLOW_REQUEST_MS:
+            logger.warning(
+                "Slow request %s %s: %.1f ms, %d statements, %.1f ms in SQL\n%s",
+                scope["method"], scope["path"], elapsed * 1000, len(queries.statements), queries.seconds * 1000,
+                "\n".join(f"  {seconds * 1000:8.2f} ms  {' '.join(statement.split())}" for statement, seconds in queries.statements)
+            )
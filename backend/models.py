@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index, func, select
+from sqlalchemy.orm import relationship, column_property
 from database import Base
 from datetime import datetime
 
 class User(Base):
     __tablename__ = "users"
+    # Never hand a deleted account's id to a new one: tokens carry the id
+    # ("uid"), and a reused id would let them read the new account. SQLite
+    # otherwise reuses the highest rowid; PostgreSQL sequences never do.
+    __table_args__ = {"sqlite_autoincrement": True}
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True)
@@ -16,19 +20,22 @@ class User(Base):
     negative_traits = Column(Text, nullable=True)
     profile_image = Column(String, nullable=True)
     
-    routines = relationship("Routine", back_populates="user")
-    habits = relationship("Habit", back_populates="user")
-    skills = relationship("Skill", back_populates="user")
-    journal_entries = relationship("JournalEntry", back_populates="user")
-    tasks = relationship("Task", back_populates="user")
-    goals = relationship("Goal", back_populates="user")
-    todos = relationship("Todo", back_populates="user")
-    bucket_lists = relationship("BucketList", back_populates="user")
+    # Everything a user owns goes with them through ON DELETE CASCADE;
+    # passive_deletes keeps the ORM from loading it first
+    routines = relationship("Routine", back_populates="user", passive_deletes=True)
+    habits = relationship("Habit", back_populates="user", passive_deletes=True)
+    skills = relationship("Skill", back_populates="user", passive_deletes=True)
+    journal_entries = relationship("JournalEntry", back_populates="user", passive_deletes=True)
+    tasks = relationship("Task", back_populates="user", passive_deletes=True)
+    goals = relationship("Goal", back_populates="user", passive_deletes=True)
+    todos = relationship("Todo", back_populates="user", passive_deletes=True)
+    bucket_lists = relationship("BucketList", back_populates="user", passive_deletes=True)
+    daily_stats = relationship("DailyUserStats", back_populates="user", passive_deletes=True)
 
 class Routine(Base):
     __tablename__ = "routines"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     name = Column(String) # e.g., "Wakeup", "Brush"
     routine_type = Column(String, default="All Days") # "Weekday", "Weekend", "All Days"
     order_index = Column(Integer) # 1, 2, 3...
@@ -40,34 +47,59 @@ class Routine(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User", back_populates="routines")
-    logs = relationship("RoutineLog", back_populates="routine")
-    tasks = relationship("RoutineTask", back_populates="routine", cascade="all, delete-orphan")
+    logs = relationship("RoutineLog", back_populates="routine", passive_deletes=True)
+    tasks = relationship("RoutineTask", back_populates="routine", cascade="all, delete-orphan", passive_deletes=True)
+    streak_runs = relationship("RoutineStreakRun", back_populates="routine", cascade="all, delete-orphan", passive_deletes=True)
 
 class RoutineTask(Base):
     __tablename__ = "routine_tasks"
     id = Column(Integer, primary_key=True, index=True)
-    routine_id = Column(Integer, ForeignKey("routines.id"))
+    routine_id = Column(Integer, ForeignKey("routines.id", ondelete="CASCADE"), index=True)
     name = Column(String) # e.g., "Wake up", "Brush"
     time = Column(String) # e.g., "05:30", "06:00"
     description = Column(String, nullable=True)
     
     routine = relationship("Routine", back_populates="tasks")
-    logs = relationship("TaskLog", back_populates="task", cascade="all, delete-orphan")
+    # The database deletes a task's logs (ON DELETE CASCADE); don't load them
+    logs = relationship("TaskLog", back_populates="task", cascade="all, delete-orphan", passive_deletes=True)
 
 class TaskLog(Base):
     __tablename__ = "task_logs"
+    __table_args__ = (
+        # One log per task per day; also serves every task_id + date lookup
+        Index("ix_task_logs_task_id_date", "task_id", "date", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey("routine_tasks.id"))
+    task_id = Column(Integer, ForeignKey("routine_tasks.id", ondelete="CASCADE"))
     completed_at = Column(DateTime, default=datetime.utcnow)
     date = Column(DateTime) # Store just the date part effectively
     status = Column(String, default="completed") # "completed", "skipped"
     
     task = relationship("RoutineTask", back_populates="logs")
 
+class RoutineStreakRun(Base):
+    # Run-length summary of fully completed days: one row per unbroken run
+    __tablename__ = "routine_streak_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    routine_id = Column(Integer, ForeignKey("routines.id", ondelete="CASCADE"), index=True)
+    start_date = Column(DateTime)
+    end_date = Column(DateTime)
+    length = Column(Integer, default=1) # days in the run, inclusive
+    
+    routine = relationship("Routine", back_populates="streak_runs")
+
+# Lifetime number of fully completed days, summed from the run summary as
+# part of every routine SELECT
+Routine.total_completed_days = column_property(
+    select(func.coalesce(func.sum(RoutineStreakRun.length), 0)).where(
+        RoutineStreakRun.routine_id == Routine.id
+    ).correlate_except(RoutineStreakRun).scalar_subquery()
+)
+
 class RoutineLog(Base):
     __tablename__ = "routine_logs"
     id = Column(Integer, primary_key=True, index=True)
-    routine_id = Column(Integer, ForeignKey("routines.id"))
+    routine_id = Column(Integer, ForeignKey("routines.id", ondelete="CASCADE"))
     completed_at = Column(DateTime, default=datetime.utcnow)
     date = Column(DateTime) # Store just the date part effectively
     
@@ -76,18 +108,18 @@ class RoutineLog(Base):
 class Habit(Base):
     __tablename__ = "habits"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     name = Column(String)
     description = Column(String, nullable=True)
     streak = Column(Integer, default=0)
     
     user = relationship("User", back_populates="habits")
-    logs = relationship("HabitLog", back_populates="habit")
+    logs = relationship("HabitLog", back_populates="habit", passive_deletes=True)
 
 class HabitLog(Base):
     __tablename__ = "habit_logs"
     id = Column(Integer, primary_key=True, index=True)
-    habit_id = Column(Integer, ForeignKey("habits.id"))
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"))
     completed_at = Column(DateTime, default=datetime.utcnow)
     
     habit = relationship("Habit", back_populates="logs")
@@ -95,18 +127,18 @@ class HabitLog(Base):
 class Skill(Base):
     __tablename__ = "skills"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     name = Column(String)
     target_hours = Column(Integer)
     current_minutes = Column(Integer, default=0)
     
     user = relationship("User", back_populates="skills")
-    logs = relationship("SkillLog", back_populates="skill")
+    logs = relationship("SkillLog", back_populates="skill", passive_deletes=True)
 
 class SkillLog(Base):
     __tablename__ = "skill_logs"
     id = Column(Integer, primary_key=True, index=True)
-    skill_id = Column(Integer, ForeignKey("skills.id"))
+    skill_id = Column(Integer, ForeignKey("skills.id", ondelete="CASCADE"))
     minutes_spent = Column(Integer)
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -116,7 +148,7 @@ class SkillLog(Base):
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     content = Column(Text)
     mood = Column(Integer) # 1-10
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -126,7 +158,7 @@ class JournalEntry(Base):
 class Task(Base):
     __tablename__ = "tasks"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     content = Column(String)
     is_completed = Column(Boolean, default=False)
     scheduled_for = Column(DateTime) # Date for the task
@@ -136,7 +168,7 @@ class Task(Base):
 class Goal(Base):
     __tablename__ = "goals"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     goal_type = Column(String) # "Long Term", "Short Term"
     name = Column(String)
     duration_type = Column(String) # "Days", "Months", "Years"
@@ -150,8 +182,11 @@ class Goal(Base):
 
 class Todo(Base):
     __tablename__ = "todos"
+    __table_args__ = (
+        Index("ix_todos_user_id_due_date", "user_id", "due_date"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     name = Column(String)
     description = Column(Text, nullable=True)
     due_date = Column(DateTime)
@@ -164,7 +199,7 @@ class Todo(Base):
 class BucketList(Base):
     __tablename__ = "bucket_lists"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     name = Column(String)
     description = Column(Text, nullable=True)
     expected_date = Column(DateTime)
@@ -172,3 +207,34 @@ class BucketList(Base):
     status = Column(String, default="waiting") # "waiting", "completed", "skipped"
     
     user = relationship("User", back_populates="bucket_lists")
+
+class DailyUserStats(Base):
+    # Per-user, per-day rollup kept up to date by the write paths in crud.py
+    __tablename__ = "daily_user_stats"
+    __table_args__ = (
+        Index("ix_daily_user_stats_user_id_day", "user_id", "day", unique=True),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    day = Column(DateTime) # midnight of the day
+    todos_total = Column(Integer, default=0) # todos due that day
+    todos_completed = Column(Integer, default=0)
+    todos_skipped = Column(Integer, default=0)
+    todos_pending = Column(Integer, default=0)
+    tasks_completed = Column(Integer, default=0)
+    routines_completed = Column(Integer, default=0) # routines with every task completed
+    
+    user = relationship("User", back_populates="daily_stats")
+
+class CollectionVersion(Base):
+    # Current version of one user's collection ("routines", "todos", ...),
+    # replaced by every write to it. Shared by all workers, so the ETags and
+    # response cache keys built on it agree everywhere.
+    __tablename__ = "collection_versions"
+    __table_args__ = (
+        Index("ix_collection_versions_user_id_collection", "user_id", "collection", unique=True),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    collection = Column(String)
+    version = Column(String) # random token, never reused
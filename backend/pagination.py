@@ -0,0 +1,71 @@
+from sqlalchemy import tuple_
+from sqlalchemy.orm import load_only
+from datetime import datetime
+import base64
+import json
+
+# Keyset pagination: rows are ordered by a unique key such as (created_at, id)
+# and a page starts strictly after the key of the previous page's last row,
+# so deep pages cost the same as the first one (no OFFSET scan).
+
+MAX_LIMIT = 500
+
+def encode_cursor(values):
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def decode_cursor(cursor: str, key_columns):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, list) or len(payload) != len(key_columns):
+        raise ValueError("Invalid cursor")
+    return [_decode_value(value, column) for value, column in zip(payload, key_columns)]
+
+def _decode_value(value, column):
+    # Each value must fit its key column, or it would reach the driver
+    if value is None:
+        return None
+    expected = column.type.python_type
+    if expected is datetime and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    elif expected is int and isinstance(value, int) and not isinstance(value, bool) and -2**63 <= value < 2**63:
+        return value
+    raise ValueError("Invalid cursor")
+
+def paginate(query, key_columns, after=None, limit: int = None):
+    """Order `query` by `key_columns`, starting after the decoded cursor `after`."""
+    query = query.order_by(*key_columns)
+    if after:
+        query = query.filter(tuple_(*key_columns) > tuple_(*after))
+    if limit:
+        query = query.limit(limit)
+    return query
+
+def next_cursor(rows, key_columns, limit: int = None):
+    # A full page means there may be more; the next page starts after its last row
+    if not limit or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor([getattr(last, column.key) for column in key_columns])
+
+def parse_fields(fields: str, schema):
+    """Validate a comma separated `fields=` projection against a response schema."""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in schema.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [name for name in names if name != "id"]
+
+def project(query, model, fields, key_columns):
+    # Only load the requested columns (plus the keys the cursor needs)
+    if not fields:
+        return query
+    names = set(fields) | {column.key for column in key_columns}
+    return query.options(load_only(*[getattr(model, name) for name in names]))
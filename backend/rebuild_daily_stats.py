@@ -0,0 +1,16 @@
+import sys
+from database import SessionLocal
+import rollups
+
+def rebuild_daily_stats(user_id=None):
+    db = SessionLocal()
+    try:
+        rows = rollups.rebuild(db, user_id=user_id)
+        db.commit()
+        print(f"Rebuilt {rows} daily_user_stats rows.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    # Optional user id: rebuild just that user
+    rebuild_daily_stats(int(sys.argv[1]) if len(sys.argv) > 1 else None)
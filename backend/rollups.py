@@ -0,0 +1,227 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+import models, database
+
+# daily_user_stats holds one row per user per day. The write paths in crud.py
+# (and the streak engine) adjust it as they go, so windowed stats read at most
+# one small row per day instead of scanning todos/task_logs. rebuild()
+# recomputes it from the raw tables.
+
+COUNTERS = [
+    "todos_total", "todos_completed", "todos_skipped", "todos_pending",
+    "tasks_completed", "routines_completed",
+]
+
+TODO_STATUS_COUNTERS = {
+    "completed": "todos_completed",
+    "skipped": "todos_skipped",
+    "pending": "todos_pending",
+}
+
+def day_of(value):
+    return datetime.combine(value.date() if isinstance(value, datetime) else value, datetime.min.time())
+
+def _upsert(db: Session, user_id: int, day, values: dict, increment: bool):
+    table = models.DailyUserStats.__table__
+    insert = database.dialect_insert(db)
+    row = {name: 0 for name in COUNTERS}
+    row.update(values)
+    stmt = insert(table).values(user_id=user_id, day=day, **row)
+    if increment:
+        set_ = {name: table.c[name] + stmt.excluded[name] for name in values}
+    else:
+        set_ = {name: stmt.excluded[name] for name in values}
+    db.execute(stmt.on_conflict_do_update(index_elements=[table.c.user_id, table.c.day], set_=set_))
+
+def bump(db: Session, user_id: int, day, **deltas):
+    """Add `deltas` to the counters of one user's day, creating the row if needed."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if user_id is None or day is None or not deltas:
+        return
+    _upsert(db, user_id, day_of(day), deltas, increment=True)
+
+def todo_deltas(status: str, sign: int):
+    deltas = {"todos_total": sign}
+    if status in TODO_STATUS_COUNTERS:
+        deltas[TODO_STATUS_COUNTERS[status]] = sign
+    return deltas
+
+def bump_todo(db: Session, user_id: int, due_date, status: str, sign: int):
+    if due_date is None:
+        return
+    bump(db, user_id, due_date, **todo_deltas(status, sign))
+
+def refresh_tasks_completed(db: Session, task_id: int, date):
+    """Recount completed tasks for the owner of `task_id` on `date`.
+
+    Only that user's logs for that one day are counted (served by the
+    task_logs (task_id, date) index). Returns the owner's id.
+    """
+    user_id = select(models.Routine.user_id).join(
+        models.RoutineTask, models.RoutineTask.routine_id == models.Routine.id
+    ).where(models.RoutineTask.id == task_id).scalar_subquery()
+
+    completed = select(func.count(models.TaskLog.id)).join(
+        models.RoutineTask, models.RoutineTask.id == models.TaskLog.task_id
+    ).join(
+        models.Routine, models.Routine.id == models.RoutineTask.routine_id
+    ).where(
+        models.Routine.user_id == user_id,
+        models.TaskLog.date == date,
+        models.TaskLog.status == "completed"
+    ).scalar_subquery()
+
+    owner, count = db.query(user_id, completed).one()
+    if owner is not None:
+        _upsert(db, owner, day_of(date), {"tasks_completed": count}, increment=False)
+    return owner
+
+def completed_log_days(db: Session, task_ids):
+    """The distinct days `task_ids` have completed logs on."""
+    return [row[0] for row in db.query(models.TaskLog.date).filter(
+        models.TaskLog.task_id.in_(task_ids),
+        models.TaskLog.status == "completed"
+    ).distinct()]
+
+def recount_tasks_completed(db: Session, user_id: int, days, chunk_size: int = 500):
+    """Recount `user_id`'s completed tasks on each of `days`.
+
+    One counting query and one multi-row upsert per `chunk_size` days.
+    """
+    days = sorted({day_of(day) for day in days})
+    table = models.DailyUserStats.__table__
+    for index in range(0, len(days), chunk_size):
+        chunk = days[index:index + chunk_size]
+        counts = dict(db.query(models.TaskLog.date, func.count(models.TaskLog.id)).join(
+            models.RoutineTask, models.RoutineTask.id == models.TaskLog.task_id
+        ).join(
+            models.Routine, models.Routine.id == models.RoutineTask.routine_id
+        ).filter(
+            models.Routine.user_id == user_id,
+            models.TaskLog.date.in_(chunk),
+            models.TaskLog.status == "completed"
+        ).group_by(models.TaskLog.date).all())
+
+        stmt = database.dialect_insert(db)(table).values([
+            {"user_id": user_id, "day": day, **{name: 0 for name in COUNTERS}, "tasks_completed": counts.get(day, 0)}
+            for day in chunk
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.day],
+            set_={"tasks_completed": stmt.excluded.tasks_completed}
+        ))
+
+def sum_stats(db: Session, user_id: int, start, end):
+    """Totals of every counter over the half-open day range [start, end)."""
+    stats = models.DailyUserStats
+    row = db.query(*[
+        func.coalesce(func.sum(getattr(stats, name)), 0) for name in COUNTERS
+    ]).filter(
+        stats.user_id == user_id,
+        stats.day >= start,
+        stats.day < end
+    ).one()
+    return dict(zip(COUNTERS, row))
+
+def get_daily_stats(db: Session, user_id: int, start, end):
+    return db.query(models.DailyUserStats).filter(
+        models.DailyUserStats.user_id == user_id,
+        models.DailyUserStats.day >= start,
+        models.DailyUserStats.day < end
+    ).order_by(models.DailyUserStats.day).all()
+
+def _as_day(value):
+    # func.date() comes back as a string on SQLite and a date on PostgreSQL
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return day_of(value)
+
+def _in_days(query, column, start=None, end=None):
+    if start is not None:
+        query = query.filter(column >= start)
+    if end is not None:
+        query = query.filter(column < end)
+    return query
+
+def routine_log_window(db: Session, routine_id: int):
+    """(owner, start, end): the [start, end) days `routine_id` has task logs on.
+
+    None when it has none. Read it before logs leave with the routine, then
+    rebuild() that window once they have.
+    """
+    row = db.query(
+        models.Routine.user_id, func.min(models.TaskLog.date), func.max(models.TaskLog.date)
+    ).join(
+        models.RoutineTask, models.RoutineTask.routine_id == models.Routine.id
+    ).join(
+        models.TaskLog, models.TaskLog.task_id == models.RoutineTask.id
+    ).filter(models.Routine.id == routine_id).group_by(models.Routine.user_id).one_or_none()
+    if row is None:
+        return None
+    owner, first, last = row
+    return owner, day_of(first), day_of(last) + timedelta(days=1)
+
+def rebuild(db: Session, user_id: int = None, start=None, end=None):
+    """Recompute daily_user_stats from todos, task_logs and streak runs.
+
+    Rebuilds one user when `user_id` is given, otherwise everyone, and only
+    the days in [start, end) when those are given (midnights). The caller
+    commits.
+    """
+    totals = defaultdict(lambda: {name: 0 for name in COUNTERS})
+
+    todos = db.query(
+        models.Todo.user_id, func.date(models.Todo.due_date), models.Todo.status, func.count(models.Todo.id)
+    ).filter(models.Todo.due_date.isnot(None))
+    if user_id is not None:
+        todos = todos.filter(models.Todo.user_id == user_id)
+    todos = _in_days(todos, models.Todo.due_date, start, end)
+    for owner, day, status, count in todos.group_by(
+        models.Todo.user_id, func.date(models.Todo.due_date), models.Todo.status
+    ):
+        row = totals[(owner, _as_day(day))]
+        for name, delta in todo_deltas(status, count).items():
+            row[name] += delta
+
+    tasks = db.query(
+        models.Routine.user_id, models.TaskLog.date, func.count(models.TaskLog.id)
+    ).join(
+        models.RoutineTask, models.RoutineTask.id == models.TaskLog.task_id
+    ).join(
+        models.Routine, models.Routine.id == models.RoutineTask.routine_id
+    ).filter(models.TaskLog.status == "completed")
+    if user_id is not None:
+        tasks = tasks.filter(models.Routine.user_id == user_id)
+    tasks = _in_days(tasks, models.TaskLog.date, start, end)
+    for owner, day, count in tasks.group_by(models.Routine.user_id, models.TaskLog.date):
+        totals[(owner, day_of(day))]["tasks_completed"] += count
+
+    # Fully completed routine days come straight from the streak runs
+    runs = db.query(
+        models.Routine.user_id, models.RoutineStreakRun.start_date, models.RoutineStreakRun.end_date
+    ).join(models.Routine, models.Routine.id == models.RoutineStreakRun.routine_id)
+    if user_id is not None:
+        runs = runs.filter(models.Routine.user_id == user_id)
+    if start is not None:
+        runs = runs.filter(models.RoutineStreakRun.end_date >= start)
+    if end is not None:
+        runs = runs.filter(models.RoutineStreakRun.start_date < end)
+    for owner, run_start, run_end in runs:
+        day = day_of(run_start) if start is None else max(day_of(run_start), start)
+        last = run_end if end is None else min(run_end, end - timedelta(days=1))
+        while day <= last:
+            totals[(owner, day)]["routines_completed"] += 1
+            day += timedelta(days=1)
+
+    existing = db.query(models.DailyUserStats)
+    if user_id is not None:
+        existing = existing.filter(models.DailyUserStats.user_id == user_id)
+    existing = _in_days(existing, models.DailyUserStats.day, start, end)
+    existing.delete(synchronize_session=False)
+
+    rows = [{"user_id": owner, "day": day, **counters} for (owner, day), counters in totals.items()]
+    if rows:
+        db.execute(models.DailyUserStats.__table__.insert(), rows)
+    return len(rows)
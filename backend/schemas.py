@@ -33,6 +33,12 @@ class TaskLog(TaskLogBase):
     class Config:
         from_attributes = True
 
+class CompletionBitmap(BaseModel):
+    # days[i] is "1" if the routine was fully completed on date_from + i days
+    date_from: datetime
+    date_to: datetime
+    days: str
+
 class RoutineBase(BaseModel):
     name: str
     routine_type: str = "All Days"
@@ -50,6 +56,7 @@ class Routine(RoutineBase):
     longest_streak: int = 0
     last_streak: int = 0
     last_completed_date: Optional[datetime] = None
+    total_completed_days: int = 0
     created_at: Optional[datetime] = None
     
     class Config:
@@ -76,6 +83,11 @@ class UserUpdate(BaseModel):
     negative_traits: Optional[str] = None
     profile_image: Optional[str] = None
 
+class CurrentUser(BaseModel):
+    # The authenticated principal, taken from the access token
+    id: int
+    username: str
+
 class User(UserBase):
     id: int
     routines: List[Routine] = []
@@ -173,3 +185,21 @@ class BucketListStats(BaseModel):
     completed: int
     skipped: int
     waiting: int
+
+class Dashboard(BaseModel):
+    goals: List[Goal] = []
+    routines: List[Routine] = []
+    today_logs: List[TaskLog] = []
+    todos: List[Todo] = []
+
+class DailyUserStats(BaseModel):
+    day: datetime
+    todos_total: int = 0
+    todos_completed: int = 0
+    todos_skipped: int = 0
+    todos_pending: int = 0
+    tasks_completed: int = 0
+    routines_completed: int = 0
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,342 @@
+"""Synthetic data generator for scale testing.
+
+Creates users with routines, tasks, years of task logs with realistic
+streaks and lapses, todos, goals and bucket lists. Rows are written in
+large batches through the raw driver (executemany, or COPY on PostgreSQL
+with psycopg2) rather than ORM objects. Streak runs and routine streak
+columns come straight from the generated pattern, and daily_user_stats is
+rebuilt at the end. The history ends on --end-date (a fixed day unless
+given), so the same --seed always produces the same data, whenever it runs.
+
+    python seed_data.py --users 1250 --years 3           # ~10M task_logs
+    python seed_data.py --users 10 --years 1 --seed 7 --end-date 2026-06-30
+
+Rows are added to the database in DATABASE_URL, after any that already
+exist. Every seeded user has the password given by --password.
+"""
+import argparse
+import io
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from database import engine
+import auth, models, rollups
+
+ROUTINE_NAMES = ["Wake up", "Workout", "Read", "Meditate", "Journal", "Study", "Walk", "Stretch"]
+ROUTINE_TYPES = ["All Days", "All Days", "All Days", "Weekday", "Weekend"]
+TASK_NAMES = ["Start", "Warm up", "Main", "Cool down", "Review", "Plan"]
+GOAL_TYPES = ["Long Term", "Short Term"]
+GOAL_STATUSES = ["Active", "Active", "Done", "Drop"]
+BUCKET_LIST_STATUSES = ["waiting", "waiting", "completed", "skipped"]
+
+# Last day of generated history; not today, so runs on different dates match
+DEFAULT_END_DATE = date(2025, 12, 31)
+
+class BulkWriter:
+    """Buffers rows for one table and writes them a batch at a time.
+
+    Values are converted to what the driver expects once, by encode(), so
+    hot loops can pass pre-encoded values straight to add().
+    """
+    def __init__(self, connection, table, columns, batch_size: int = 50000, parents=()):
+        self.connection = connection
+        self.table = table
+        self.columns = columns
+        self.batch_size = batch_size
+        # Writers whose rows ours reference; flushed first so foreign keys hold
+        self.parents = parents
+        self.rows = []
+        self.count = 0
+
+        dialect = connection.dialect
+        self.copy = dialect.name == "postgresql" and dialect.driver == "psycopg2"
+        self._processors = {}
+        for name in columns:
+            column_type = table.c[name].type
+            self._processors[name] = None if self.copy else column_type.dialect_impl(dialect).bind_processor(dialect)
+        placeholder = "?" if dialect.paramstyle == "qmark" else "%s"
+        self._insert = (
+            f"INSERT INTO {table.name} ({', '.join(columns)}) "
+            f"VALUES ({', '.join([placeholder] * len(columns))})"
+        )
+
+    def encode(self, name: str, value):
+        processor = self._processors[name]
+        return processor(value) if processor and value is not None else value
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def add_values(self, **values):
+        self.add(tuple(self.encode(name, values.get(name)) for name in self.columns))
+
+    def flush(self):
+        for parent in self.parents:
+            parent.flush()
+        if not self.rows:
+            return
+        cursor = self.connection.connection.dbapi_connection.cursor()
+        try:
+            if self.copy:
+                cursor.copy_expert(
+                    f"COPY {self.table.name} ({', '.join(self.columns)}) FROM STDIN",
+                    io.StringIO("".join(_copy_line(row) for row in self.rows))
+                )
+            else:
+                cursor.executemany(self._insert, self.rows)
+        finally:
+            cursor.close()
+        self.count += len(self.rows)
+        self.rows = []
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+def _copy_line(row):
+    return "\t".join(_copy_value(value) for value in row) + "\n"
+
+def _next_id(connection, model):
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+def sync_sequences(connection):
+    # Rows were inserted with explicit ids; move PostgreSQL's sequences past them
+    if connection.dialect.name != "postgresql":
+        return
+    for table in models.Base.metadata.sorted_tables:
+        if "id" in table.c:
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), COALESCE(MAX(id), 1)) FROM {table.name}"
+            ))
+
+@contextmanager
+def _bulk_connection():
+    """A connection in a transaction, like engine.begin(), for bulk loads.
+
+    On SQLite it skips fsyncs (the data set can always be regenerated). The
+    pragma stays with the driver connection, so that connection is
+    invalidated afterwards instead of going back to the pool.
+    """
+    with engine.connect() as connection:
+        sqlite = connection.dialect.name == "sqlite"
+        try:
+            if sqlite:
+                connection.exec_driver_sql("PRAGMA synchronous=OFF")
+                connection.commit()
+            with connection.begin():
+                yield connection
+        finally:
+            if sqlite:
+                connection.invalidate()
+
+def _scheduled(routine_type: str, day):
+    if routine_type == "Weekday":
+        return day.weekday() < 5
+    if routine_type == "Weekend":
+        return day.weekday() >= 5
+    return True
+
+def _routine_logs(rng, days, encoded_days, task_ids, routine_type, adherence):
+    """Generate one routine's task log rows, oldest day first.
+
+    A two-state walk: while on a streak every task is done each scheduled
+    day, until a lapse (chance 1 - adherence). A lapse lasts a few days in
+    which some tasks are done or skipped, but never all of them. Returns the
+    rows and the indexes of the fully completed days.
+    """
+    logs, complete_days = [], []
+    on_streak = rng.random() < adherence
+    for index, day in enumerate(days):
+        if not _scheduled(routine_type, day):
+            continue
+        on_streak = rng.random() < (adherence if on_streak else 0.35)
+        encoded = encoded_days[index]
+        if on_streak:
+            complete_days.append(index)
+            for task_id in task_ids:
+                logs.append((task_id, encoded, "completed", encoded))
+            continue
+        missed = rng.randrange(len(task_ids))
+        for position, task_id in enumerate(task_ids):
+            roll = rng.random()
+            if roll < 0.3 and position != missed:
+                logs.append((task_id, encoded, "completed", encoded))
+            elif roll < 0.4:
+                logs.append((task_id, encoded, "skipped", encoded))
+    return logs, complete_days
+
+def _streak_runs(complete_days):
+    # Unbroken runs of consecutive calendar days, as streaks.rebuild builds them
+    runs = []
+    for index in complete_days:
+        if runs and index == runs[-1][1] + 1:
+            runs[-1][1] = index
+        else:
+            runs.append([index, index])
+    return runs
+
+def seed(
+    users: int = 10, routines: int = 4, tasks: int = 3, years: int = 1, todos: int = 200,
+    goals: int = 3, bucket_lists: int = 5, seed: int = 42, password: str = "password",
+    batch_size: int = 50000, rebuild_stats: bool = True, end_date: date = DEFAULT_END_DATE
+):
+    """Generate the data set and commit it. Returns the number of rows per table."""
+    rng = random.Random(seed)
+    hashed_password = auth.get_password_hash(password)
+    last_day = datetime.combine(end_date, datetime.min.time())
+    days = [last_day - timedelta(days=offset) for offset in range(years * 365 - 1, -1, -1)]
+
+    with _bulk_connection() as connection:
+        def writer(model, *columns, parents=()):
+            return BulkWriter(connection, model.__table__, list(columns), batch_size, parents)
+
+        user_writer = writer(models.User, "id", "username", "email", "full_name", "hashed_password", "hobby")
+        routine_writer = writer(
+            models.Routine, "id", "user_id", "name", "routine_type", "order_index", "description",
+            "current_streak", "longest_streak", "last_streak", "last_completed_date", "created_at",
+            parents=[user_writer]
+        )
+        task_writer = writer(models.RoutineTask, "id", "routine_id", "name", "time", "description", parents=[routine_writer])
+        log_writer = writer(models.TaskLog, "task_id", "date", "status", "completed_at", parents=[task_writer])
+        run_writer = writer(models.RoutineStreakRun, "routine_id", "start_date", "end_date", "length", parents=[routine_writer])
+        todo_writer = writer(models.Todo, "user_id", "name", "description", "due_date", "status", "created_at", parents=[user_writer])
+        goal_writer = writer(
+            models.Goal, "user_id", "goal_type", "name", "duration_type", "duration_value",
+            "start_date", "end_date", "agenda", "status",
+            parents=[user_writer]
+        )
+        bucket_list_writer = writer(
+            models.BucketList, "user_id", "name", "description", "expected_date", "created_date", "status",
+            parents=[user_writer]
+        )
+
+        # Every log on a day shares one encoded date value
+        encoded_days = [log_writer.encode("date", day) for day in days]
+
+        user_id = _next_id(connection, models.User)
+        routine_id = _next_id(connection, models.Routine)
+        task_id = _next_id(connection, models.RoutineTask)
+
+        for _ in range(users):
+            user_writer.add_values(
+                id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com",
+                full_name=f"User {user_id}", hashed_password=hashed_password, hobby=rng.choice(ROUTINE_NAMES)
+            )
+            # Some users are far more consistent than others
+            base_adherence = rng.uniform(0.6, 0.95)
+
+            for order_index in range(routines):
+                routine_type = rng.choice(ROUTINE_TYPES)
+                task_ids = list(range(task_id, task_id + tasks))
+                task_id += tasks
+                adherence = min(0.98, max(0.3, base_adherence + rng.uniform(-0.15, 0.1)))
+                logs, complete_days = _routine_logs(rng, days, encoded_days, task_ids, routine_type, adherence)
+                runs = _streak_runs(complete_days)
+
+                # Streak columns as streaks.rebuild would set them
+                routine_writer.add_values(
+                    id=routine_id, user_id=user_id, name=ROUTINE_NAMES[(order_index + user_id) % len(ROUTINE_NAMES)],
+                    routine_type=routine_type, order_index=order_index, description=None,
+                    current_streak=runs[-1][1] - runs[-1][0] + 1 if runs else 0,
+                    longest_streak=max((end - start + 1 for start, end in runs), default=0),
+                    last_streak=runs[-2][1] - runs[-2][0] + 1 if len(runs) > 1 else 0,
+                    last_completed_date=days[runs[-1][1]] if runs else None,
+                    created_at=days[0]
+                )
+                for index, current in enumerate(task_ids):
+                    task_writer.add_values(
+                        id=current, routine_id=routine_id, name=TASK_NAMES[index % len(TASK_NAMES)],
+                        time=f"{(6 + order_index * 2 + index) % 24:02d}:{rng.choice(['00', '15', '30', '45'])}"
+                    )
+                for start, end in runs:
+                    run_writer.add_values(routine_id=routine_id, start_date=days[start], end_date=days[end], length=end - start + 1)
+                for row in logs:
+                    log_writer.add(row)
+                routine_id += 1
+
+            for _ in range(todos):
+                # Spread over the whole period plus a month ahead
+                due = last_day + timedelta(minutes=rng.randrange(-years * 365 * 24 * 60, 30 * 24 * 60))
+                if due >= last_day:
+                    status = "pending"
+                else:
+                    status = rng.choices(["completed", "skipped", "pending"], weights=[7, 1, 2])[0]
+                todo_writer.add_values(
+                    user_id=user_id, name=f"Todo {rng.randrange(1000)}", description=None,
+                    due_date=due, status=status, created_at=due - timedelta(days=rng.randrange(1, 14))
+                )
+
+            for _ in range(goals):
+                start = rng.choice(days)
+                duration = rng.choice([30, 90, 180, 365])
+                goal_writer.add_values(
+                    user_id=user_id, goal_type=rng.choice(GOAL_TYPES), name=f"Goal {rng.randrange(1000)}",
+                    duration_type="Days", duration_value=duration, start_date=start,
+                    end_date=start + timedelta(days=duration), agenda="Generated", status=rng.choice(GOAL_STATUSES)
+                )
+
+            for _ in range(bucket_lists):
+                created = rng.choice(days)
+                bucket_list_writer.add_values(
+                    user_id=user_id, name=f"Bucket list {rng.randrange(1000)}", description=None,
+                    expected_date=created + timedelta(days=rng.randrange(30, 3 * 365)),
+                    created_date=created, status=rng.choice(BUCKET_LIST_STATUSES)
+                )
+
+            user_id += 1
+
+        # Parents before children, so foreign keys hold at every flush
+        writers = [
+            user_writer, routine_writer, task_writer, log_writer, run_writer,
+            todo_writer, goal_writer, bucket_list_writer,
+        ]
+        for bulk_writer in writers:
+            bulk_writer.flush()
+        sync_sequences(connection)
+
+        if rebuild_stats:
+            with Session(bind=connection) as db:
+                rollups.rebuild(db)
+                db.flush()
+
+    return {bulk_writer.table.name: bulk_writer.count for bulk_writer in writers}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--routines", type=int, default=4, help="routines per user")
+    parser.add_argument("--tasks", type=int, default=3, help="tasks per routine")
+    parser.add_argument("--years", type=int, default=1, help="years of task logs")
+    parser.add_argument("--todos", type=int, default=200, help="todos per user")
+    parser.add_argument("--goals", type=int, default=3, help="goals per user")
+    parser.add_argument("--bucket-lists", type=int, default=5, help="bucket lists per user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--end-date", type=date.fromisoformat, default=DEFAULT_END_DATE,
+        help=f"last day of generated history (default {DEFAULT_END_DATE})"
+    )
+    parser.add_argument("--password", default="password", help="password of every seeded user")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--skip-daily-stats", action="store_true", help="don't rebuild daily_user_stats")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    counts = seed(
+        users=args.users, routines=args.routines, tasks=args.tasks, years=args.years,
+        todos=args.todos, goals=args.goals, bucket_lists=args.bucket_lists, seed=args.seed,
+        password=args.password, batch_size=args.batch_size, rebuild_stats=not args.skip_daily_stats,
+        end_date=args.end_date
+    )
+    elapsed = time.perf_counter() - start
+    for table, count in counts.items():
+        print(f"{table}: {count}")
+    print(f"Seeded {sum(counts.values())} rows in {elapsed:.1f}s.")
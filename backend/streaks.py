@@ -0,0 +1,172 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from datetime import timedelta
+import models, rollups
+
+# Streaks are derived from routine_streak_runs: one row per unbroken run of
+# fully completed days. Ticking or unticking a task only ever touches the run
+# containing that day and its direct neighbours, so backfilled dates cost the
+# same as today's and no TaskLog history is rescanned.
+
+ONE_DAY = timedelta(days=1)
+
+def _lock_routine(db: Session, task_id: int):
+    # The task's routine, locked until commit (SELECT ... FOR UPDATE; SQLite
+    # already serializes writers). Streak updates for one routine then run
+    # one at a time, each seeing the logs the previous one committed, so two
+    # requests finishing the last tasks of a day (or adjacent days) can't
+    # both act on a stale picture of it.
+    return db.query(models.Routine).join(
+        models.RoutineTask, models.RoutineTask.routine_id == models.Routine.id
+    ).filter(
+        models.RoutineTask.id == task_id
+    ).with_for_update(of=models.Routine).populate_existing().one_or_none()
+
+def _day_state(db: Session, routine_id: int, date):
+    # Number of tasks and number of completed tasks on `date`, in one statement
+    total_tasks = select(func.count(models.RoutineTask.id)).where(
+        models.RoutineTask.routine_id == routine_id
+    ).scalar_subquery()
+
+    completed_tasks = select(func.count(func.distinct(models.TaskLog.task_id))).join(
+        models.RoutineTask, models.RoutineTask.id == models.TaskLog.task_id
+    ).where(
+        models.RoutineTask.routine_id == routine_id,
+        models.TaskLog.date == date,
+        models.TaskLog.status == "completed"
+    ).scalar_subquery()
+
+    return db.query(total_tasks, completed_tasks).one()
+
+def _add_day(db: Session, routine, runs, date):
+    before = next((r for r in runs if r.end_date == date - ONE_DAY), None)
+    after = next((r for r in runs if r.start_date == date + ONE_DAY), None)
+
+    if before and after:
+        # The day bridges two runs: merge them
+        before.end_date = after.end_date
+        before.length += 1 + after.length
+        db.delete(after)
+        run = before
+    elif before:
+        before.end_date = date
+        before.length += 1
+        run = before
+    elif after:
+        after.start_date = date
+        after.length += 1
+        run = after
+    else:
+        run = models.RoutineStreakRun(routine_id=routine.id, start_date=date, end_date=date, length=1)
+        db.add(run)
+
+    if run.length > (routine.longest_streak or 0):
+        routine.longest_streak = run.length
+
+def _remove_day(db: Session, routine, run, date):
+    old_length = run.length
+
+    if run.start_date == run.end_date:
+        db.delete(run)
+    elif date == run.start_date:
+        run.start_date = date + ONE_DAY
+        run.length -= 1
+    elif date == run.end_date:
+        run.end_date = date - ONE_DAY
+        run.length -= 1
+    else:
+        # Split the run around the removed day
+        tail = models.RoutineStreakRun(
+            routine_id=routine.id,
+            start_date=date + ONE_DAY,
+            end_date=run.end_date,
+            length=(run.end_date - date).days
+        )
+        db.add(tail)
+        run.end_date = date - ONE_DAY
+        run.length = (date - run.start_date).days
+
+    db.flush()
+
+    if old_length >= (routine.longest_streak or 0):
+        # The record may have been this run; take the max over the run summary
+        routine.longest_streak = db.query(func.max(models.RoutineStreakRun.length)).filter(
+            models.RoutineStreakRun.routine_id == routine.id
+        ).scalar() or 0
+
+def _refresh_current(db: Session, routine):
+    latest = db.query(models.RoutineStreakRun).filter(
+        models.RoutineStreakRun.routine_id == routine.id
+    ).order_by(models.RoutineStreakRun.end_date.desc()).limit(2).all()
+
+    routine.current_streak = latest[0].length if latest else 0
+    routine.last_completed_date = latest[0].end_date if latest else None
+    routine.last_streak = latest[1].length if len(latest) > 1 else 0
+
+def update_for_day(db: Session, task_id: int, date):
+    """Bring the routine's streak in line with the task logs for `date`.
+
+    Call after adding, changing or deleting a TaskLog, inside the same
+    transaction; the caller commits.
+    """
+    routine = _lock_routine(db, task_id)
+    if routine is None:
+        return None
+    total_tasks, completed_tasks = _day_state(db, routine.id, date)
+
+    is_complete = total_tasks > 0 and completed_tasks >= total_tasks
+
+    # The run containing `date` (if any) plus the runs touching it either side
+    runs = db.query(models.RoutineStreakRun).filter(
+        models.RoutineStreakRun.routine_id == routine.id,
+        models.RoutineStreakRun.start_date <= date + ONE_DAY,
+        models.RoutineStreakRun.end_date >= date - ONE_DAY
+    ).all()
+    containing = next((r for r in runs if r.start_date <= date <= r.end_date), None)
+    was_complete = containing is not None
+
+    if is_complete == was_complete:
+        return None
+
+    if is_complete:
+        _add_day(db, routine, runs, date)
+    else:
+        _remove_day(db, routine, containing, date)
+    rollups.bump(db, routine.user_id, date, routines_completed=1 if is_complete else -1)
+
+    db.flush()
+    _refresh_current(db, routine)
+    return routine
+
+def rebuild(db: Session, routine):
+    """Recompute a routine's runs and streak columns from its full TaskLog history."""
+    db.query(models.RoutineStreakRun).filter(
+        models.RoutineStreakRun.routine_id == routine.id
+    ).delete(synchronize_session=False)
+
+    task_ids = [t.id for t in routine.tasks]
+    dates = []
+    if task_ids:
+        dates = [row[0] for row in db.query(models.TaskLog.date).filter(
+            models.TaskLog.task_id.in_(task_ids),
+            models.TaskLog.status == "completed"
+        ).group_by(
+            models.TaskLog.date
+        ).having(
+            func.count(func.distinct(models.TaskLog.task_id)) >= len(task_ids)
+        ).order_by(models.TaskLog.date).all()]
+
+    longest = 0
+    run = None
+    for date in dates:
+        if run is not None and date == run.end_date + ONE_DAY:
+            run.end_date = date
+            run.length += 1
+        else:
+            run = models.RoutineStreakRun(routine_id=routine.id, start_date=date, end_date=date, length=1)
+            db.add(run)
+        longest = max(longest, run.length)
+
+    routine.longest_streak = longest
+    db.flush()
+    _refresh_current(db, routine)
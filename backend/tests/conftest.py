@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A throwaway working dir (static files, SQLite database) and settings,
+# before main.py is imported so it picks them up
+WORKDIR = tempfile.mkdtemp(prefix="habbit_tests_")
+os.makedirs(os.path.join(WORKDIR, "static", "images"))
+os.chdir(WORKDIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/test.db"
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+sys.path.insert(0, BACKEND_DIR)
+
+import main, database, models
+from fastapi.testclient import TestClient
+
+@pytest.fixture(autouse=True)
+def reset_database():
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+@pytest.fixture
+def db():
+    with database.SessionLocal() as session:
+        yield session
+
+@pytest.fixture
+def user(client):
+    response = client.post("/users/", json={
+        "username": "alice", "email": "alice@example.com", "full_name": "Alice", "password": "password",
+    })
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.fixture
+def login(client):
+    """Returns the Authorization header for a username (password "password")."""
+    def headers(username):
+        response = client.post("/token", data={"username": username, "password": "password"})
+        assert response.status_code == 200
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return headers
+
+@pytest.fixture
+def count_statements():
+    """Context manager collecting the SQL statements run inside it."""
+    engine = database.async_engine.sync_engine if database.async_engine else database.engine
+
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return counting
@@ -0,0 +1,97 @@
+from datetime import date
+
+import pytest
+
+import auth
+
+@pytest.fixture
+def auth_required(monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_REQUIRED", True)
+
+@pytest.fixture
+def mallory(client):
+    response = client.post("/users/", json={
+        "username": "mallory", "email": "mallory@example.com", "full_name": "Mallory", "password": "password",
+    })
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.fixture
+def owned(client, user):
+    # One row of every kind, owned by `user`, created before auth is turned on
+    user_id = user["id"]
+    routine = client.post(f"/users/{user_id}/routines/", json={
+        "name": "Morning", "routine_type": "All Days", "order_index": 1,
+        "tasks": [{"name": "Task", "time": "06:00"}],
+    }).json()
+    goal = client.post(f"/users/{user_id}/goals/", json={
+        "goal_type": "Long Term", "name": "Goal", "duration_type": "Days", "duration_value": 3,
+        "start_date": "2026-01-01T00:00:00", "end_date": "2026-01-04T00:00:00", "agenda": "a",
+    }).json()
+    todo = client.post(f"/users/{user_id}/todos/", json={"name": "Todo", "due_date": "2026-01-01T00:00:00"}).json()
+    bucket_list = client.post(f"/users/{user_id}/bucketlists/", json={"name": "Trip", "expected_date": "2027-01-01T00:00:00"}).json()
+    return {"routine": routine, "task": routine["tasks"][0], "goal": goal, "todo": todo, "bucket_list": bucket_list}
+
+def requests_for(owned):
+    today = date.today().isoformat()
+    routine_id, task_id = owned["routine"]["id"], owned["task"]["id"]
+    return [
+        ("get", f"/users/{owned['routine']['user_id']}/routines/", {}),
+        ("put", f"/routines/{routine_id}", {"json": {
+            "name": "x", "routine_type": "All Days", "order_index": 1,
+            "tasks": [{"id": task_id, "name": "Task", "time": "06:00"}],
+        }}),
+        ("get", f"/routines/{routine_id}/history", {}),
+        ("get", f"/routines/{routine_id}/history/bitmap", {"params": {"from": today, "to": today}}),
+        ("get", f"/routines/{routine_id}/logs", {}),
+        ("post", f"/routines/{routine_id}/complete", {}),
+        ("post", f"/tasks/{task_id}/complete", {}),
+        ("delete", f"/tasks/{task_id}/complete", {}),
+        ("post", "/tasks/complete:batch", {"json": [{"task_id": task_id, "date": f"{today}T00:00:00"}]}),
+        ("put", f"/goals/{owned['goal']['id']}", {"json": {"name": "x"}}),
+        ("put", f"/todos/{owned['todo']['id']}", {"json": {"name": "x"}}),
+        ("put", f"/bucketlists/{owned['bucket_list']['id']}", {"json": {"name": "x"}}),
+        ("delete", f"/goals/{owned['goal']['id']}", {}),
+        ("delete", f"/todos/{owned['todo']['id']}", {}),
+        ("delete", f"/bucketlists/{owned['bucket_list']['id']}", {}),
+        ("delete", f"/routines/{routine_id}", {}),
+    ]
+
+def test_anonymous_requests_are_rejected(client, owned, auth_required):
+    for method, url, kwargs in requests_for(owned):
+        response = client.request(method, url, **kwargs)
+        assert response.status_code == 401, (method, url)
+
+def test_other_users_are_forbidden(client, owned, mallory, auth_required, login):
+    headers = login("mallory")
+    for method, url, kwargs in requests_for(owned):
+        response = client.request(method, url, headers=headers, **kwargs)
+        assert response.status_code == 403, (method, url)
+
+def test_owner_is_allowed(client, owned, auth_required, login):
+    headers = login("alice")
+    for method, url, kwargs in requests_for(owned):
+        response = client.request(method, url, headers=headers, **kwargs)
+        assert response.status_code == 200, (method, url, response.text)
+
+def test_deleting_an_account_always_needs_its_token(client, user, mallory, login):
+    # AUTH_REQUIRED is off here
+    url = f"/users/{user['id']}"
+    assert client.delete(url).status_code == 401
+    assert client.delete(url, headers=login("mallory")).status_code == 403
+    assert client.delete(url, headers=login("alice")).status_code == 200
+    assert client.post("/token", data={"username": "alice", "password": "password"}).status_code == 401
+
+def test_deleted_account_ids_are_not_reused(client, user, auth_required, login):
+    headers = login("alice")
+    assert client.delete(f"/users/{user['id']}", headers=headers).status_code == 200
+
+    response = client.post("/users/", json={
+        "username": "bob", "email": "bob@example.com", "full_name": "Bob", "password": "password",
+    })
+    assert response.status_code == 200
+    bob = response.json()
+    assert bob["id"] != user["id"]
+    # The deleted account's token still verifies, but names no one else
+    assert client.get(f"/users/{bob['id']}/todos/", headers=headers).status_code == 403
+    assert client.get(f"/users/{bob['id']}/todos/", headers=login("bob")).status_code == 200
@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+import models, rollups
+
+TODAY = date.today()
+
+def day(offset: int):
+    return (TODAY - timedelta(days=offset)).isoformat()
+
+def create_routine(client, user_id, tasks: int = 2):
+    response = client.post(f"/users/{user_id}/routines/", json={
+        "name": "Morning", "routine_type": "All Days", "order_index": 1,
+        "tasks": [{"name": f"Task {index}", "time": "06:00"} for index in range(tasks)],
+    })
+    assert response.status_code == 200
+    return response.json()
+
+def complete_day(client, routine, offset: int):
+    for task in routine["tasks"]:
+        assert client.post(f"/tasks/{task['id']}/complete", params={"date_str": day(offset)}).status_code == 200
+
+def daily_stats(client, user_id):
+    response = client.get(f"/users/{user_id}/stats/daily", params={"date_from": day(10), "date_to": day(0)})
+    assert response.status_code == 200
+    return {
+        row["day"][:10]: (row["tasks_completed"], row["routines_completed"])
+        for row in response.json() if row["tasks_completed"] or row["routines_completed"]
+    }
+
+def assert_matches_rebuild(db, user_id):
+    incremental = sorted(tuple(getattr(row, name) for name in ["day", *rollups.COUNTERS]) for row in rollups.get_daily_stats(
+        db, user_id, rollups.day_of(TODAY - timedelta(days=30)), rollups.day_of(TODAY + timedelta(days=1))
+    ))
+    rollups.rebuild(db, user_id)
+    db.flush()
+    rebuilt = sorted(tuple(getattr(row, name) for name in ["day", *rollups.COUNTERS]) for row in db.query(models.DailyUserStats).filter_by(user_id=user_id))
+    db.rollback()
+    assert [row for row in incremental if any(row[1:])] == [row for row in rebuilt if any(row[1:])]
+
+def test_deleting_a_routine_removes_its_days(client, db, user):
+    kept, deleted = create_routine(client, user["id"]), create_routine(client, user["id"])
+    complete_day(client, kept, 1)
+    complete_day(client, deleted, 1)
+    complete_day(client, deleted, 0)
+    assert daily_stats(client, user["id"]) == {day(1): (4, 2), day(0): (2, 1)}
+
+    assert client.delete(f"/routines/{deleted['id']}").status_code == 200
+    assert daily_stats(client, user["id"]) == {day(1): (2, 1)}
+    assert_matches_rebuild(db, user["id"])
+
+def test_removing_a_task_recounts_its_days(client, db, user):
+    routine = create_routine(client, user["id"])
+    first, second = routine["tasks"]
+    assert client.post(f"/tasks/{first['id']}/complete", params={"date_str": day(0)}).status_code == 200
+    complete_day(client, routine, 1)
+    assert daily_stats(client, user["id"]) == {day(1): (2, 1), day(0): (1, 0)}
+
+    # The second task's log leaves with it; streaks are not recomputed
+    response = client.put(f"/routines/{routine['id']}", json={
+        "name": "Morning", "routine_type": "All Days", "order_index": 1,
+        "tasks": [{"id": first["id"], "name": first["name"], "time": first["time"]}],
+    })
+    assert response.status_code == 200
+    assert response.json()["current_streak"] == 1
+    assert daily_stats(client, user["id"]) == {day(1): (1, 1), day(0): (1, 0)}
+    assert_matches_rebuild(db, user["id"])
+
+def test_adding_a_task_keeps_completed_days(client, db, user):
+    routine = create_routine(client, user["id"])
+    complete_day(client, routine, 1)
+    complete_day(client, routine, 0)
+
+    response = client.put(f"/routines/{routine['id']}", json={
+        "name": "Morning", "routine_type": "All Days", "order_index": 1,
+        "tasks": [*routine["tasks"], {"name": "New", "time": "07:00"}],
+    })
+    assert response.status_code == 200
+    routine = response.json()
+    assert (routine["current_streak"], routine["longest_streak"], routine["total_completed_days"]) == (2, 2, 2)
+    assert daily_stats(client, user["id"]) == {day(1): (2, 1), day(0): (2, 1)}
+    assert_matches_rebuild(db, user["id"])
+
+    # The new task set applies going forward
+    for task in routine["tasks"][:2]:
+        assert client.post(f"/tasks/{task['id']}/complete", params={"date_str": day(-1)}).status_code == 200
+    assert client.get(f"/users/{user['id']}/routines/").json()[0]["current_streak"] == 2
+    complete_day(client, routine, -1)
+    assert client.get(f"/users/{user['id']}/routines/").json()[0]["current_streak"] == 3
@@ -0,0 +1,35 @@
+import cache
+
+def test_etag_revalidates_until_a_write(client, user):
+    url = f"/users/{user['id']}/todos/"
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    assert client.post(url, json={"name": "Todo", "due_date": "2026-01-01T00:00:00"}).status_code == 200
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 1
+
+def test_versions_are_shared_between_workers(client, db, user):
+    # Another worker has its own response cache but reads the same versions
+    url = f"/users/{user['id']}/routines/"
+    etag = client.get(url).headers["ETag"]
+    before = cache.versions(db, user["id"], ["routines"])
+    db.rollback()
+
+    assert client.post(url, json={"name": "Morning", "routine_type": "All Days", "order_index": 1, "tasks": []}).status_code == 200
+    after = cache.versions(db, user["id"], ["routines"])
+    assert after != before
+
+    cache.response_cache.backend.clear()
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+def test_new_account_gets_fresh_versions(client, db, user, login):
+    assert client.delete(f"/users/{user['id']}", headers=login("alice")).status_code == 200
+    response = client.post("/users/", json={
+        "username": "bob", "email": "bob@example.com", "full_name": "Bob", "password": "password",
+    })
+    versions = cache.versions(db, response.json()["id"], cache.USER_COLLECTIONS)
+    assert cache.INITIAL_VERSION not in versions
@@ -0,0 +1,24 @@
+def create_routine(client, user_id):
+    response = client.post(f"/users/{user_id}/routines/", json={
+        "name": "Morning", "routine_type": "All Days", "order_index": 1,
+        "tasks": [{"name": "Task", "time": "06:00"}],
+    })
+    assert response.status_code == 200
+    return response.json()
+
+def test_bitmap_covers_up_to_a_leap_year(client, user):
+    routine = create_routine(client, user["id"])
+    url = f"/routines/{routine['id']}/history/bitmap"
+
+    response = client.get(url, params={"from": "2024-01-01", "to": "2024-12-31"})
+    assert response.status_code == 200
+    assert len(response.json()["days"]) == 366
+
+    response = client.get(url, params={"from": "0001-01-01", "to": "9998-12-31"})
+    assert response.status_code == 400
+
+def test_last_representable_day_is_rejected_not_a_500(client, user):
+    routine = create_routine(client, user["id"])
+    for path in ("history", "history/bitmap", "logs"):
+        response = client.get(f"/routines/{routine['id']}/{path}", params={"from": "9999-12-01", "to": "9999-12-31"})
+        assert response.status_code == 400, path
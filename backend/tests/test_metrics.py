@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+import metrics
+
+def test_failed_statements_leave_no_timing_state():
+    engine = create_engine("sqlite://")
+    metrics.instrument(engine)
+    queries = metrics.RequestQueries()
+    token = metrics.current_queries.set(queries)
+    try:
+        with engine.connect() as connection:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    connection.exec_driver_sql("SELECT * FROM missing")
+            connection.exec_driver_sql("SELECT 1")
+            assert not any(key.startswith("metrics") for key in connection.info)
+    finally:
+        metrics.current_queries.reset(token)
+
+    assert [statement for statement, seconds in queries.statements] == ["SELECT 1"]
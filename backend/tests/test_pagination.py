@@ -0,0 +1,36 @@
+import base64
+import json
+
+import pytest
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def test_pages_follow_the_cursor(client, user):
+    for index in range(5):
+        response = client.post(f"/users/{user['id']}/todos/", json={"name": f"Todo {index}", "due_date": "2026-01-01T00:00:00"})
+        assert response.status_code == 200
+
+    names, params = [], {"limit": 2}
+    while True:
+        response = client.get(f"/users/{user['id']}/todos/", params=params)
+        assert response.status_code == 200
+        names += [todo["name"] for todo in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params = {"limit": 2, "cursor": response.headers["X-Next-Cursor"]}
+    assert names == [f"Todo {index}" for index in range(5)]
+
+@pytest.mark.parametrize("value", [
+    "not base64 json",
+    cursor(["a", {"x": 1}]),
+    cursor(["2026-01-01T00:00:00", "1"]),
+    cursor(["2026-01-01T00:00:00", True]),
+    cursor(["2026-01-01T00:00:00", 2**70]),
+    cursor([1, 1]),
+    cursor(["2026-01-01T00:00:00"]),
+    cursor({"created_at": "2026-01-01T00:00:00", "id": 1}),
+])
+def test_malformed_cursor_is_400(client, user, value):
+    response = client.get(f"/users/{user['id']}/todos/", params={"cursor": value})
+    assert response.status_code == 400
@@ -0,0 +1,51 @@
+import pytest
+
+# Nested routines, tasks and goals are loaded in a fixed number of queries,
+# however many routines a user has
+
+def add_routines(client, user_id, count):
+    for index in range(count):
+        response = client.post(f"/users/{user_id}/routines/", json={
+            "name": f"Routine {index}",
+            "routine_type": "All Days",
+            "order_index": index,
+            "tasks": [{"name": "First", "time": "06:00"}, {"name": "Second", "time": "07:00"}],
+        })
+        assert response.status_code == 200
+    response = client.post(f"/users/{user_id}/goals/", json={
+        "goal_type": "Long Term", "name": "Goal", "duration_type": "Days", "duration_value": 3,
+        "start_date": "2026-01-01T00:00:00", "end_date": "2026-01-04T00:00:00", "agenda": "a",
+    })
+    assert response.status_code == 200
+
+@pytest.mark.parametrize("path", [
+    "/users/{user_id}",
+    "/users/{user_id}/routines/",
+    "/users/{user_id}/dashboard",
+])
+def test_statement_count_does_not_grow_with_routines(client, user, count_statements, path):
+    url = path.format(user_id=user["id"])
+    counts = []
+    added = 0
+    for routines in (1, 5, 10):
+        add_routines(client, user["id"], routines - added)
+        added = routines
+        with count_statements() as statements:
+            response = client.get(url)
+        assert response.status_code == 200
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1] == counts[2], f"{path}: {counts} statements for 1, 5 and 10 routines"
+
+def test_routine_logs_are_one_statement(client, user, count_statements):
+    add_routines(client, user["id"], 1)
+    routine = client.get(f"/users/{user['id']}/routines/").json()[0]
+    for task in routine["tasks"]:
+        assert client.post(f"/tasks/{task['id']}/complete", params={"date_str": "2026-01-01"}).status_code == 200
+
+    with count_statements() as statements:
+        response = client.get(f"/routines/{routine['id']}/logs")
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert len(statements) == 1
+    assert client.get("/routines/999/logs").json() == []
@@ -0,0 +1,25 @@
+from datetime import date, datetime
+
+import database, models, seed_data
+
+def task_logs(db):
+    return db.query(models.TaskLog.task_id, models.TaskLog.date, models.TaskLog.status).order_by(
+        models.TaskLog.task_id, models.TaskLog.date
+    ).all()
+
+def test_same_seed_gives_the_same_data(db):
+    first = seed_data.seed(users=2, routines=3, todos=10, seed=7, end_date=date(2025, 6, 30))
+    logs = task_logs(db)
+    assert max(log.date for log in logs) <= datetime(2025, 6, 30)
+
+    db.rollback()
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+    assert seed_data.seed(users=2, routines=3, todos=10, seed=7, end_date=date(2025, 6, 30)) == first
+    assert task_logs(db) == logs
+
+def test_bulk_load_leaves_pooled_connections_synchronous():
+    seed_data.seed(users=1, routines=1, todos=1, goals=0, bucket_lists=0)
+    for _ in range(database.engine.pool.size() + 1):
+        with database.engine.connect() as connection:
+            assert connection.exec_driver_sql("PRAGMA synchronous").scalar() != 0
@@ -0,0 +1,158 @@
+import random
+from datetime import date, datetime, timedelta
+
+import models, streaks, update_db_schema_v6
+
+# The incremental run summary must always agree with a full rebuild from
+# the task logs
+
+TODAY = date.today()
+
+def day(offset: int):
+    return (TODAY - timedelta(days=offset)).isoformat()
+
+def create_routine(client, user_id, tasks: int = 2):
+    response = client.post(f"/users/{user_id}/routines/", json={
+        "name": "Morning",
+        "routine_type": "All Days",
+        "order_index": 1,
+        "tasks": [{"name": f"Task {index}", "time": "06:00"} for index in range(tasks)],
+    })
+    assert response.status_code == 200
+    return response.json()
+
+def complete(client, task_id, offset: int):
+    response = client.post(f"/tasks/{task_id}/complete", params={"date_str": day(offset)})
+    assert response.status_code == 200
+
+def uncomplete(client, task_id, offset: int):
+    response = client.delete(f"/tasks/{task_id}/complete", params={"date_str": day(offset)})
+    assert response.status_code == 200
+
+def complete_day(client, routine, offset: int):
+    for task in routine["tasks"]:
+        complete(client, task["id"], offset)
+
+def runs(db, routine_id):
+    return [
+        (run.start_date.date().isoformat(), run.end_date.date().isoformat(), run.length)
+        for run in db.query(models.RoutineStreakRun).filter_by(routine_id=routine_id).order_by(models.RoutineStreakRun.start_date)
+    ]
+
+def streak_columns(db, routine_id):
+    routine = db.get(models.Routine, routine_id)
+    db.refresh(routine)
+    return routine.current_streak, routine.longest_streak, routine.last_streak, routine.last_completed_date
+
+def assert_matches_rebuild(db, routine_id):
+    incremental = runs(db, routine_id), streak_columns(db, routine_id)
+    streaks.rebuild(db, db.get(models.Routine, routine_id))
+    db.flush()
+    assert (runs(db, routine_id), streak_columns(db, routine_id)) == incremental
+    db.rollback()
+
+def test_consecutive_days_form_one_run(client, db, user):
+    routine = create_routine(client, user["id"])
+    for offset in (2, 1, 0):
+        complete_day(client, routine, offset)
+
+    assert runs(db, routine["id"]) == [(day(2), day(0), 3)]
+    current, longest, last, last_completed = streak_columns(db, routine["id"])
+    assert (current, longest, last) == (3, 3, 0)
+    assert last_completed == datetime.fromisoformat(day(0))
+
+def test_partially_completed_day_is_not_a_streak_day(client, db, user):
+    routine = create_routine(client, user["id"])
+    complete(client, routine["tasks"][0]["id"], 0)
+
+    assert runs(db, routine["id"]) == []
+    assert streak_columns(db, routine["id"]) == (0, 0, 0, None)
+
+def test_bridging_day_merges_runs(client, db, user):
+    routine = create_routine(client, user["id"])
+    for offset in (4, 3, 1, 0):
+        complete_day(client, routine, offset)
+    assert runs(db, routine["id"]) == [(day(4), day(3), 2), (day(1), day(0), 2)]
+    assert streak_columns(db, routine["id"])[:3] == (2, 2, 2)
+
+    complete_day(client, routine, 2)
+    assert runs(db, routine["id"]) == [(day(4), day(0), 5)]
+    assert streak_columns(db, routine["id"])[:3] == (5, 5, 0)
+
+def test_unticking_a_day_splits_its_run(client, db, user):
+    routine = create_routine(client, user["id"])
+    for offset in range(5):
+        complete_day(client, routine, offset)
+
+    uncomplete(client, routine["tasks"][1]["id"], 2)
+    assert runs(db, routine["id"]) == [(day(4), day(3), 2), (day(1), day(0), 2)]
+    assert streak_columns(db, routine["id"])[:3] == (2, 2, 2)
+
+def test_skipped_status_breaks_the_day(client, db, user):
+    routine = create_routine(client, user["id"])
+    complete_day(client, routine, 0)
+    response = client.post(f"/tasks/{routine['tasks'][0]['id']}/complete", params={"date_str": day(0), "status": "skipped"})
+    assert response.status_code == 200
+
+    assert runs(db, routine["id"]) == []
+
+def test_batch_completion_across_routines(client, db, user):
+    first, second = create_routine(client, user["id"]), create_routine(client, user["id"], tasks=3)
+    response = client.post("/tasks/complete:batch", json=[
+        {"task_id": task["id"], "date": f"{day(offset)}T00:00:00"}
+        for routine in (second, first) for task in routine["tasks"] for offset in (1, 0)
+    ])
+    assert response.status_code == 200
+
+    assert runs(db, first["id"]) == [(day(1), day(0), 2)]
+    assert runs(db, second["id"]) == [(day(1), day(0), 2)]
+
+def test_random_history_matches_rebuild(client, db, user):
+    routine = create_routine(client, user["id"], tasks=3)
+    task_ids = [task["id"] for task in routine["tasks"]]
+    rng = random.Random(7)
+    for _ in range(200):
+        task_id, offset = rng.choice(task_ids), rng.randrange(20)
+        if rng.random() < 0.7:
+            complete(client, task_id, offset)
+        else:
+            client.delete(f"/tasks/{task_id}/complete", params={"date_str": day(offset)})
+
+    assert_matches_rebuild(db, routine["id"])
+
+def test_total_completed_days_spans_all_runs(client, db, user):
+    routine = create_routine(client, user["id"])
+    for offset in (400, 399, 2, 0):
+        complete_day(client, routine, offset)
+
+    response = client.get(f"/users/{user['id']}/routines/")
+    assert response.json()[0]["total_completed_days"] == 4
+
+def test_migration_keeps_streaks_of_routines_that_gained_tasks(client, db, user):
+    # As the old code left it: ten days completed with one task, then a
+    # second task added
+    routine = create_routine(client, user["id"])
+    for offset in range(1, 11):
+        complete(client, routine["tasks"][0]["id"], offset)
+    complete_day(client, routine, 12)
+    stored = db.get(models.Routine, routine["id"])
+    stored.current_streak, stored.longest_streak, stored.last_completed_date = 10, 10, datetime.fromisoformat(day(1))
+    db.query(models.RoutineStreakRun).delete()
+
+    update_db_schema_v6.backfill(db, stored)
+    db.commit()
+
+    assert runs(db, routine["id"]) == [(day(12), day(12), 1), (day(10), day(1), 10)]
+    assert streak_columns(db, routine["id"]) == (10, 10, 1, datetime.fromisoformat(day(1)))
+
+def test_migration_keeps_a_longer_stored_longest_streak(client, db, user):
+    routine = create_routine(client, user["id"])
+    complete_day(client, routine, 0)
+    stored = db.get(models.Routine, routine["id"])
+    stored.longest_streak = 30
+
+    update_db_schema_v6.backfill(db, stored)
+    db.commit()
+
+    assert runs(db, routine["id"]) == [(day(0), day(0), 1)]
+    assert streak_columns(db, routine["id"])[:2] == (1, 30)
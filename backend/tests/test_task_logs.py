@@ -0,0 +1,25 @@
+from datetime import date
+
+import models
+
+def create_routine(client, user_id):
+    response = client.post(f"/users/{user_id}/routines/", json={
+        "name": "Morning", "routine_type": "All Days", "order_index": 1,
+        "tasks": [{"name": "Task", "time": "06:00"}],
+    })
+    assert response.status_code == 200
+    return response.json()
+
+def test_completing_unknown_task_is_404(client):
+    response = client.post("/tasks/999/complete")
+    assert response.status_code == 404
+
+def test_batch_with_unknown_task_is_404_and_writes_nothing(client, db, user):
+    task_id = create_routine(client, user["id"])["tasks"][0]["id"]
+    today = f"{date.today().isoformat()}T00:00:00"
+    response = client.post("/tasks/complete:batch", json=[
+        {"task_id": task_id, "date": today},
+        {"task_id": 999, "date": today},
+    ])
+    assert response.status_code == 404
+    assert db.query(models.TaskLog).count() == 0
@@ -0,0 +1,20 @@
+import pytest
+
+@pytest.mark.parametrize("params", [
+    {"filter_type": "month", "month": 13, "year": 2026},
+    {"filter_type": "month", "month": 0, "year": 2026},
+    {"filter_type": "year", "year": 0},
+    {"filter_type": "year", "year": 9999},
+])
+def test_out_of_range_month_or_year_is_rejected(client, user, params):
+    response = client.get(f"/users/{user['id']}/todos/stats", params=params)
+    assert response.status_code == 422
+
+def test_month_window(client, user):
+    for due_date in ("2026-02-28T23:00:00", "2026-03-01T00:00:00", "2026-03-31T23:59:00", "2026-04-01T00:00:00"):
+        response = client.post(f"/users/{user['id']}/todos/", json={"name": "Todo", "due_date": due_date})
+        assert response.status_code == 200
+
+    response = client.get(f"/users/{user['id']}/todos/stats", params={"filter_type": "month", "month": 3, "year": 2026})
+    assert response.status_code == 200
+    assert response.json()["total"] == 2
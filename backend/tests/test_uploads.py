@@ -0,0 +1,30 @@
+import io
+import os
+
+from PIL import Image
+
+import uploads
+
+def png():
+    out = io.BytesIO()
+    Image.new("RGB", (40, 30), "red").save(out, "PNG")
+    return out.getvalue()
+
+def test_partial_files_stay_outside_static(client, monkeypatch):
+    seen = []
+    store_image = uploads.store_image
+
+    def spy(temp_path, digest):
+        seen.append(temp_path)
+        return store_image(temp_path, digest)
+
+    monkeypatch.setattr(uploads, "store_image", spy)
+    response = client.post("/upload", files={"file": ("red.png", png(), "image/png")})
+    assert response.status_code == 200
+    response = client.post("/upload", files={"file": ("notes.png", b"not an image", "image/png")})
+    assert response.status_code == 400
+
+    static = os.path.abspath("static")
+    assert all(not os.path.abspath(path).startswith(static) for path in seen)
+    assert os.listdir(uploads.UPLOAD_TEMP_DIR) == []
+    assert all(uploads.CONTENT_ADDRESSED_NAME.match(name) for name in os.listdir(uploads.UPLOAD_DIR))
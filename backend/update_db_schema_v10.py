@@ -0,0 +1,27 @@
+from sqlalchemy import create_engine
+from database import SQLALCHEMY_DATABASE_URL
+from update_db_schema_v9 import apply_ondelete, delete_orphans
+import models
+
+# Parents before children, so rows orphaned by an earlier step are cleared
+# by a later one
+TABLES = [
+    models.Routine, models.Habit, models.Skill, models.JournalEntry, models.Task,
+    models.Goal, models.Todo, models.BucketList, models.DailyUserStats,
+    models.RoutineTask, models.RoutineStreakRun, models.RoutineLog,
+    models.HabitLog, models.SkillLog,
+]
+
+def update_schema():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    # user_id -> users and routine_id/habit_id/skill_id -> their parents,
+    # all ON DELETE CASCADE
+    apply_ondelete(engine, [model.__table__ for model in TABLES])
+
+    # task_logs already cascades (update_db_schema_v9.py); drop logs of
+    # tasks removed above
+    with engine.begin() as connection:
+        delete_orphans(connection, models.TaskLog.__table__)
+
+if __name__ == "__main__":
+    update_schema()
@@ -0,0 +1,14 @@
+from sqlalchemy import create_engine
+from database import SQLALCHEMY_DATABASE_URL
+import models
+
+def update_schema():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+    # Creates collection_versions. Users without rows get a fixed initial
+    # version until their first write.
+    models.Base.metadata.create_all(bind=engine)
+    print("Created collection_versions table.")
+
+if __name__ == "__main__":
+    update_schema()
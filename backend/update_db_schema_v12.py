@@ -0,0 +1,19 @@
+from sqlalchemy import create_engine
+from database import SQLALCHEMY_DATABASE_URL
+from update_db_schema_v9 import _rebuild_sqlite
+import models
+
+def update_schema():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    if engine.dialect.name != "sqlite":
+        print("Nothing to do: sequences never reuse ids.")
+        return
+
+    # users becomes AUTOINCREMENT so a deleted account's id is never reused.
+    # Ids are copied as they are; sqlite_sequence starts from the highest.
+    with engine.begin() as connection:
+        _rebuild_sqlite(connection, models.User.__table__)
+    print("Recreated users with AUTOINCREMENT ids.")
+
+if __name__ == "__main__":
+    update_schema()
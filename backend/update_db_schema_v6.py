@@ -0,0 +1,56 @@
+from datetime import timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import SQLALCHEMY_DATABASE_URL
+import models, streaks
+
+def backfill(db, routine):
+    """Build a routine's run summary from its task logs, keeping its streak.
+
+    The logs are judged against the routine's current task set, so a day
+    completed before a task was added no longer counts. Rather than lose
+    that history, the stored current streak is seeded as a run ending on
+    last_completed_date (merged with any rebuilt run it touches), and the
+    stored longest streak is kept when it is the larger.
+    """
+    current, longest, last_completed = routine.current_streak, routine.longest_streak, routine.last_completed_date
+    streaks.rebuild(db, routine)
+
+    if current and last_completed is not None:
+        start = last_completed - timedelta(days=current - 1)
+        touching = db.query(models.RoutineStreakRun).filter(
+            models.RoutineStreakRun.routine_id == routine.id,
+            models.RoutineStreakRun.start_date <= last_completed + streaks.ONE_DAY,
+            models.RoutineStreakRun.end_date >= start - streaks.ONE_DAY
+        ).all()
+        end = last_completed
+        for run in touching:
+            start, end = min(start, run.start_date), max(end, run.end_date)
+            db.delete(run)
+        db.add(models.RoutineStreakRun(
+            routine_id=routine.id, start_date=start, end_date=end, length=(end - start).days + 1
+        ))
+        db.flush()
+        streaks._refresh_current(db, routine)
+
+    routine.longest_streak = max(routine.longest_streak or 0, routine.current_streak or 0, longest or 0)
+
+def update_schema():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+    # Creates routine_streak_runs
+    models.Base.metadata.create_all(bind=engine)
+
+    # Backfill the run summary (and streak columns) from existing task logs
+    db = sessionmaker(bind=engine)()
+    try:
+        routines = db.query(models.Routine).all()
+        for routine in routines:
+            backfill(db, routine)
+        db.commit()
+        print(f"Rebuilt streaks for {len(routines)} routines.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    update_schema()
@@ -0,0 +1,31 @@
+from sqlalchemy import create_engine, text
+from database import SQLALCHEMY_DATABASE_URL
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_routines_user_id ON routines (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_routine_tasks_routine_id ON routine_tasks (routine_id)",
+    "CREATE INDEX IF NOT EXISTS ix_goals_user_id ON goals (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_bucket_lists_user_id ON bucket_lists (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_todos_user_id_due_date ON todos (user_id, due_date)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_task_logs_task_id_date ON task_logs (task_id, date)",
+]
+
+def update_schema():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    with engine.connect() as connection:
+        # The unique index can't be built while duplicate task/day logs exist;
+        # keep the most recent log for each pair.
+        result = connection.execute(text("""
+            DELETE FROM task_logs
+            WHERE id NOT IN (SELECT MAX(id) FROM task_logs GROUP BY task_id, date)
+        """))
+        connection.commit()
+        print(f"Removed {result.rowcount} duplicate task logs.")
+
+        for statement in INDEXES:
+            connection.execute(text(statement))
+            connection.commit()
+            print(f"Applied: {statement}")
+
+if __name__ == "__main__":
+    update_schema()
@@ -0,0 +1,17 @@
+from sqlalchemy import create_engine
+from database import SQLALCHEMY_DATABASE_URL
+from rebuild_daily_stats import rebuild_daily_stats
+import models
+
+def update_schema():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+    # Creates daily_user_stats
+    models.Base.metadata.create_all(bind=engine)
+    print("Created daily_user_stats table.")
+
+    # Needs routine_streak_runs to be populated (update_db_schema_v6.py)
+    rebuild_daily_stats()
+
+if __name__ == "__main__":
+    update_schema()
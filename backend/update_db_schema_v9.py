@@ -0,0 +1,71 @@
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.schema import CreateTable
+from database import SQLALCHEMY_DATABASE_URL
+import models
+
+# Recreates foreign keys with the ON DELETE rules declared in models.py, so
+# the database removes dependent rows itself instead of the ORM loading them.
+
+def delete_orphans(connection, table):
+    # Rows pointing at parents that are already gone would block the new keys
+    for fk in table.foreign_keys:
+        if fk.ondelete != "CASCADE":
+            continue
+        column, target = fk.parent, fk.column
+        result = connection.execute(text(
+            f"DELETE FROM {table.name} WHERE {column.name} IS NOT NULL "
+            f"AND {column.name} NOT IN (SELECT {target.name} FROM {target.table.name})"
+        ))
+        print(f"Removed {result.rowcount} orphaned rows from {table.name}.")
+
+def _rebuild_sqlite(connection, table):
+    # SQLite can't alter a constraint: copy into a new table with the current
+    # definition, drop the old one and take its name (foreign keys stay off
+    # on this connection, so nothing cascades while doing it).
+    new_name = f"{table.name}_new"
+    columns = ", ".join(
+        column["name"] for column in inspect(connection).get_columns(table.name)
+        if column["name"] in table.c
+    )
+    create = str(CreateTable(table).compile(connection)).replace(
+        f"CREATE TABLE {table.name} ", f"CREATE TABLE {new_name} ", 1
+    )
+    connection.execute(text(create))
+    connection.execute(text(f"INSERT INTO {new_name} ({columns}) SELECT {columns} FROM {table.name}"))
+    connection.execute(text(f"DROP TABLE {table.name}"))
+    connection.execute(text(f"ALTER TABLE {new_name} RENAME TO {table.name}"))
+    for index in table.indexes:
+        index.create(connection)
+
+def _alter_postgres(connection, table):
+    existing = inspect(connection).get_foreign_keys(table.name)
+    for fk in table.foreign_keys:
+        if fk.ondelete is None:
+            continue
+        column, target = fk.parent, fk.column
+        for constraint in existing:
+            if constraint["constrained_columns"] == [column.name]:
+                connection.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT "{constraint["name"]}"'))
+        connection.execute(text(
+            f"ALTER TABLE {table.name} ADD CONSTRAINT {table.name}_{column.name}_fkey "
+            f"FOREIGN KEY ({column.name}) REFERENCES {target.table.name} ({target.name}) "
+            f"ON DELETE {fk.ondelete}"
+        ))
+
+def apply_ondelete(engine, tables):
+    for table in tables:
+        with engine.begin() as connection:
+            delete_orphans(connection, table)
+            if engine.dialect.name == "sqlite":
+                _rebuild_sqlite(connection, table)
+            else:
+                _alter_postgres(connection, table)
+        print(f"Recreated foreign keys of {table.name}.")
+
+def update_schema():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    # task_logs.task_id -> routine_tasks ON DELETE CASCADE
+    apply_ondelete(engine, [models.TaskLog.__table__])
+
+if __name__ == "__main__":
+    update_schema()
@@ -0,0 +1,244 @@
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import uuid
+
+# Uploads are streamed straight from the request body to a temp file in
+# bounded chunks (disk writes in the threadpool), so a large upload never
+# sits in memory or blocks the event loop, and one over the limit is
+# refused as soon as it gets there. Decoding and resizing run in image_pool.
+#
+# Files are named by the SHA-256 of the uploaded bytes (<hash>.<ext>, with
+# variants as <hash>_<variant>.webp): the same image uploaded twice is stored
+# once, and a name never changes content, so it can be cached forever.
+
+UPLOAD_DIR = "static/images"
+# In-progress uploads and variants are written here, outside the /static
+# mount so partial files are never served, then os.replace()d into
+# UPLOAD_DIR. Keep it on the same filesystem so the rename stays atomic.
+UPLOAD_TEMP_DIR = os.getenv("UPLOAD_TEMP_DIR", "upload_tmp")
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost:8002")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Room for the multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+image_pool = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+
+# WebP variants: name -> (edge in px, square crop)
+VARIANTS = {
+    "avatar": (160, True),
+    "medium": (800, False),
+}
+
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(UPLOAD_TEMP_DIR, exist_ok=True)
+
+class UploadTooLarge(Exception):
+    pass
+
+class _FilePart:
+    # python-multipart callbacks that collect the data of one named file field
+    def __init__(self, field: str):
+        self.field = field
+        self.filename = None
+        self.size = 0
+        self.pending = bytearray()
+        self.digest = hashlib.sha256()
+        self._in_field = False
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._disposition = b""
+
+    def on_header_field(self, data, start, end):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        self._in_field = (
+            self.filename is None
+            and options.get(b"name") == self.field.encode()
+            and b"filename" in options
+        )
+        if self._in_field:
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+
+    def on_part_data(self, data, start, end):
+        if self._in_field:
+            self.pending += data[start:end]
+            self.size += end - start
+
+    def on_part_end(self):
+        self._in_field = False
+
+    def flush(self, out):
+        self.digest.update(self.pending)
+        out.write(self.pending)
+        self.pending.clear()
+
+async def receive_upload(request, field: str = "file"):
+    """Stream the `field` file of a multipart request into a temp file.
+
+    Returns the temp file's path and the SHA-256 hex digest of its
+    contents. Raises UploadTooLarge once the file passes
+    MAX_UPLOAD_BYTES (or straight away when Content-Length says it will) and
+    ValueError for anything that isn't a multipart upload of `field`.
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD:
+        raise UploadTooLarge()
+
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected a multipart/form-data upload")
+
+    part = _FilePart(field)
+    parser = MultipartParser(params[b"boundary"], part.callbacks())
+    fd, temp_path = await run_in_threadpool(tempfile.mkstemp, dir=UPLOAD_TEMP_DIR, suffix=".part")
+    out = os.fdopen(fd, "wb")
+    try:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            parser.write(chunk)
+            if part.size > MAX_UPLOAD_BYTES or received > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD:
+                raise UploadTooLarge()
+            if len(part.pending) >= UPLOAD_CHUNK_SIZE:
+                await run_in_threadpool(part.flush, out)
+        parser.finalize()
+        await run_in_threadpool(part.flush, out)
+        if part.filename is None:
+            raise ValueError(f"No file in form field '{field}'")
+    except BaseException:
+        await run_in_threadpool(_discard, out, temp_path)
+        raise
+    await run_in_threadpool(out.close)
+    return temp_path, part.digest.hexdigest()
+
+def _discard(out, path):
+    out.close()
+    os.remove(path)
+
+def _save_variant(image, name: str, stem: str):
+    edge, square = VARIANTS[name]
+    if square:
+        variant = ImageOps.fit(image, (edge, edge))
+    else:
+        variant = image.copy()
+        variant.thumbnail((edge, edge))
+    # Written aside and moved into place, so a concurrent upload of the same
+    # image never serves a half-written file
+    path = os.path.join(UPLOAD_DIR, f"{stem}_{name}.webp")
+    temp_path = os.path.join(UPLOAD_TEMP_DIR, f"{stem}_{name}.{uuid.uuid4().hex}.webp")
+    variant.save(temp_path, "WEBP", quality=80, method=4)
+    os.replace(temp_path, path)
+
+def store_image(temp_path: str, digest: str):
+    """Validate an uploaded image, keep the original and write its variants.
+
+    Runs in image_pool. Returns {"original": file name, <variant>: file
+    name, ...} relative to UPLOAD_DIR. An image stored before is neither
+    decoded nor written again. Raises ValueError (and removes the upload)
+    if the file isn't an image Pillow can read.
+    """
+    try:
+        with Image.open(temp_path) as image:
+            # Only the header is read until load()
+            extension = (image.format or "img").lower().replace("jpeg", "jpg")
+            names = {"original": f"{digest}.{extension}"}
+            names.update({name: f"{digest}_{name}.webp" for name in VARIANTS})
+            missing = [name for name in VARIANTS if not os.path.exists(os.path.join(UPLOAD_DIR, names[name]))]
+            if missing:
+                image.load()
+                image = ImageOps.exif_transpose(image)
+                image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+    except (OSError, Image.DecompressionBombError):
+        os.remove(temp_path)
+        raise ValueError("Uploaded file is not a supported image")
+
+    original = os.path.join(UPLOAD_DIR, names["original"])
+    if os.path.exists(original):
+        os.remove(temp_path)
+    else:
+        os.replace(temp_path, original)
+    for name in missing:
+        _save_variant(image, name, digest)
+    return names
+
+async def save_upload(request, field: str = "file"):
+    temp_path, digest = await receive_upload(request, field)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(image_pool, store_image, temp_path, digest)
+
+def public_url(file_name: str):
+    return f"{PUBLIC_BASE_URL}/{UPLOAD_DIR}/{file_name}"
+
+CONTENT_ADDRESSED_NAME = re.compile(r"^[0-9a-f]{64}(_[a-z]+)?\.[a-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class ContentAddressedStaticFiles(StaticFiles):
+    """StaticFiles that lets clients cache content-addressed uploads for good.
+
+    Such a file's name identifies its bytes, so the name is its strong ETag
+    and the response is marked immutable: browsers and proxies reuse it
+    without asking again. FileResponse answers Range / If-Range and
+    If-None-Match / If-Modified-Since itself. Other files are served as usual.
+    """
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        file_name = os.path.basename(full_path)
+        if not CONTENT_ADDRESSED_NAME.match(file_name):
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        headers = {"cache-control": IMMUTABLE_CACHE_CONTROL, "etag": f'"{file_name}"'}
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+# /upload reads the body itself; describe it for the OpenAPI docs
+OPENAPI_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
@@ -21,60 +21,22 @@ function Dashboard() {
         }
         const parsedUser = JSON.parse(userData);
         setUser(parsedUser);
-        fetchActiveGoals(parsedUser.id);
-        fetchRoutines(parsedUser.id);
-        fetchRoutines(parsedUser.id);
-        fetchCompletedTasks(parsedUser.id);
-        fetchTodos(parsedUser.id);
+        fetchDashboard(parsedUser.id);
     }, [navigate]);
 
-    const fetchActiveGoals = async (userId) => {
+    const fetchDashboard = async (userId) => {
         try {
-            const response = await fetch(`http://localhost:8002/users/${userId}/goals/`);
+            const response = await fetch(`http://localhost:8002/users/${userId}/dashboard`);
             if (response.ok) {
                 const data = await response.json();
-                const active = data.filter(goal => goal.status === 'Active');
-                setActiveGoals(active);
+                setActiveGoals(data.goals.filter(goal => goal.status === 'Active'));
+                setRoutines(data.routines);
+                setCompletedTasks(data.today_logs.map(log => log.task_id));
+                filterUpcomingTodos(data.todos);
+                calculateTodayStats(data.todos);
             }
         } catch (error) {
-            console.error("Error fetching goals:", error);
-        }
-    };
-
-    const fetchRoutines = async (userId) => {
-        try {
-            const response = await fetch(`http://localhost:8002/users/${userId}/routines/`);
-            if (response.ok) {
-                const data = await response.json();
-                setRoutines(data);
-            }
-        } catch (error) {
-            console.error("Error fetching routines:", error);
-        }
-    };
-
-    const fetchCompletedTasks = async (userId) => {
-        try {
-            const response = await fetch(`http://localhost:8002/users/${userId}/tasks/today`);
-            if (response.ok) {
-                const data = await response.json();
-                setCompletedTasks(data.map(log => log.task_id));
-            }
-        } catch (error) {
-            console.error("Error fetching completed tasks:", error);
-        }
-    };
-
-    const fetchTodos = async (userId) => {
-        try {
-            const response = await fetch(`http://localhost:8002/users/${userId}/todos/`);
-            if (response.ok) {
-                const data = await response.json();
-                filterUpcomingTodos(data);
-                calculateTodayStats(data);
-            }
-        } catch (error) {
-            console.error("Error fetching todos:", error);
+            console.error("Error fetching dashboard:", error);
         }
     };
 
@@ -70,7 +70,8 @@ function Profile() {
 
             if (response.ok) {
                 const data = await response.json();
-                setFormData(prev => ({ ...prev, profile_image: data.url }));
+                // Store the small avatar variant, not the full-size original
+                setFormData(prev => ({ ...prev, profile_image: data.thumbnail_url || data.url }));
                 setMessage('Image uploaded successfully!');
             } else {
                 setMessage('Failed to upload image.');
@@ -14,10 +14,15 @@ const RoutineDetail = () => {
 
     const [selectedDate, setSelectedDate] = useState(new Date().toISOString().split('T')[0]);
     const [taskLogs, setTaskLogs] = useState([]);
+    const [selectedYear, setSelectedYear] = useState(new Date().getFullYear());
 
     useEffect(() => {
         fetchRoutineData();
-    }, [id]);
+    }, [id, selectedYear]);
+
+    useEffect(() => {
+        fetchTaskLogs();
+    }, [id, selectedDate]);
 
     const fetchRoutineData = async () => {
         try {
@@ -38,19 +43,27 @@ const RoutineDetail = () => {
                 }
             }
 
-            const historyRes = await fetch(`http://localhost:8002/routines/${id}/history`);
+            // Only the year shown in the graph
+            const historyRes = await fetch(`http://localhost:8002/routines/${id}/history?from=${selectedYear}-01-01&to=${selectedYear}-12-31`);
             if (historyRes.ok) {
                 const data = await historyRes.json();
                 setHistory(data.map(d => new Date(d).toISOString().split('T')[0]));
             }
+        } catch (error) {
+            console.error("Error fetching routine data:", error);
+        }
+    };
 
-            const logsRes = await fetch(`http://localhost:8002/routines/${id}/logs`);
+    const fetchTaskLogs = async () => {
+        try {
+            // Only the logs for the selected day
+            const logsRes = await fetch(`http://localhost:8002/routines/${id}/logs?from=${selectedDate}&to=${selectedDate}`);
             if (logsRes.ok) {
                 const data = await logsRes.json();
                 setTaskLogs(data);
             }
         } catch (error) {
-            console.error("Error fetching routine data:", error);
+            console.error("Error fetching task logs:", error);
         }
     };
 
@@ -63,6 +76,7 @@ const RoutineDetail = () => {
             const response = await fetch(url, { method });
             if (response.ok) {
                 fetchRoutineData(); // Refresh data to update graph and logs
+                fetchTaskLogs();
             }
         } catch (error) {
             console.error("Error toggling task:", error);
@@ -104,8 +118,6 @@ const RoutineDetail = () => {
         }
     };
 
-    const [selectedYear, setSelectedYear] = useState(new Date().getFullYear());
-
     const getBadges = (streak) => {
         const milestones = [
             { days: 3, label: "3 Days", icon: "🥉" },
@@ -252,7 +264,7 @@ const RoutineDetail = () => {
                 </div>
                 <div className="stat-card">
                     <h3>Total Days Completed</h3>
-                    <div className="stat-value">{history.length} <span className="stat-unit">days</span></div>
+                    <div className="stat-value">{routine.total_completed_days} <span className="stat-unit">days</span></div>
                 </div>
                 <div className="stat-card">
                     <h3>Started On</h3>